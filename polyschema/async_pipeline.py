@@ -0,0 +1,189 @@
+import argparse
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, List, Optional, Sequence, Tuple, Union
+from models import IntermediateSchema
+from tool import MapperTool
+from batch import _get_workers
+from serialization import BINARY_EXTENSION, dumps
+
+# Pipeline assíncrono: as fontes são lidas no event loop (I/O), o parse e a geração rodam num executor
+# (CPU) e cada resultado segue para as sinks assim que fica pronto. Filas limitadas seguram a leitura
+# quando o mapeamento fica para trás, e o mapeamento quando quem consome os resultados fica para trás.
+
+@dataclass
+class SchemaItem:
+    name: str
+    # Texto (str/bytes) ou leitor com read() síncrono ou assíncrono (arquivo, asyncio.StreamReader...)
+    source: Any
+    # None: o dialeto é detectado pelo conteúdo (MapperTool.detect)
+    parser_name: Optional[str] = None
+
+@dataclass
+class PipelineResult:
+    name: str
+    parser_name: Optional[str] = None
+    schema: Optional[IntermediateSchema] = None
+    output: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+class _FileReader:
+    # Leitor preguiçoso: o arquivo só é aberto quando o pipeline chega nele (respeitando a contrapressão)
+    def __init__(self, path: str):
+        self.path = path
+
+    async def read(self) -> str:
+        def read_file():
+            with open(self.path, 'r', encoding='utf-8') as f: return f.read()
+        return await asyncio.get_running_loop().run_in_executor(None, read_file)
+
+async def directory_source(input_dir: str, suffix: str = ".txt", parser_name: Optional[str] = None) -> AsyncIterator[SchemaItem]:
+    # Fonte embutida: cada arquivo `suffix` de `input_dir`, em ordem alfabética
+    for filename in sorted(os.listdir(input_dir)):
+        path = os.path.join(input_dir, filename)
+        if filename.endswith(suffix) and os.path.isfile(path):
+            yield SchemaItem(name=filename, source=_FileReader(path), parser_name=parser_name)
+
+class DirectorySink:
+    # Sink embutida: grava a saída gerada em `output_dir/<name>` (e o .psb, com binary=True)
+    def __init__(self, output_dir: str, binary: bool = False):
+        self.output_dir = output_dir
+        self.binary = binary
+        os.makedirs(output_dir, exist_ok=True)
+
+    def _write(self, result: PipelineResult):
+        path = os.path.join(self.output_dir, os.path.basename(result.name))
+        with open(path, 'w', encoding='utf-8') as f: f.write(result.output)
+        if self.binary:
+            with open(os.path.splitext(path)[0] + BINARY_EXTENSION, 'wb') as f: f.write(dumps(result.schema))
+
+    async def write(self, result: PipelineResult):
+        if result.ok: await asyncio.get_running_loop().run_in_executor(None, self._write, result)
+
+def _map_text(text: str, parser_name: str) -> Tuple[IntermediateSchema, str]:
+    # Roda no executor; reaproveita as instâncias por worker do batch
+    tool, generator = _get_workers()
+    schema = tool.map(text, parser_name)
+    return schema, generator.generate(schema)
+
+async def _read_source(source: Any) -> str:
+    if hasattr(source, "read"):
+        source = source.read()
+        if asyncio.iscoroutine(source) or isinstance(source, asyncio.Future): source = await source
+    return source.decode('utf-8') if isinstance(source, (bytes, bytearray)) else source
+
+async def _iterate(items: Union[AsyncIterable, Iterable]):
+    if hasattr(items, "__aiter__"):
+        async for item in items: yield item
+    else:
+        for item in items: yield item
+
+def _make_executor(executor: str, workers: int) -> Executor:
+    if executor == "process": return ProcessPoolExecutor(max_workers=workers)
+    if executor == "thread": return ThreadPoolExecutor(max_workers=workers)
+    raise ValueError(f"Executor '{executor}' desconhecido (use 'process' ou 'thread').")
+
+async def map_schemas(items: Union[AsyncIterable, Iterable], sinks: Sequence = (), workers: Optional[int] = None,
+                      executor: Union[str, Executor] = "process", queue_size: Optional[int] = None,
+                      tool: Optional[MapperTool] = None) -> AsyncIterator[PipelineResult]:
+    # `items`: SchemaItem ou tuplas (name, texto-ou-leitor, parser). Os resultados saem na ordem em que
+    # terminam; erros de leitura, parse ou sink ficam no PipelineResult sem interromper os demais itens.
+    # Sinks são objetos com `async write(result)`.
+    loop = asyncio.get_running_loop()
+    workers = max(1, workers or os.cpu_count() or 1)
+    queue_size = queue_size or workers * 2
+    pool = _make_executor(executor, workers) if isinstance(executor, str) else executor
+    detector = tool or MapperTool()
+    pending: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    done: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    source_error: List[BaseException] = []
+
+    async def produce():
+        try:
+            async for item in _iterate(items):
+                if not isinstance(item, SchemaItem): item = SchemaItem(*item)
+                try:
+                    await pending.put((item, await _read_source(item.source), None))
+                except Exception as e:
+                    await pending.put((item, None, f"Falha ao ler a fonte: {e}"))
+        except Exception as e:
+            # Erro da própria fonte (ex.: diretório inexistente): encerra os workers e é relançado no fim.
+            # Em cancelamento não há sentinelas, pois a fila pode estar cheia e ninguém mais a consome.
+            source_error.append(e)
+        for _ in range(workers): await pending.put(None)
+
+    async def consume():
+        # O sentinela sai no finally: um item problemático não pode deixar map_schemas esperando para sempre.
+        # Em cancelamento não há sentinela, pois ninguém mais consome `done`.
+        cancelled = False
+        try:
+            while (entry := await pending.get()) is not None:
+                item, text, error = entry
+                result = PipelineResult(name=item.name, parser_name=item.parser_name, error=error)
+                try:
+                    if result.ok and not isinstance(text, str):
+                        result.error = f"A fonte devolveu {type(text).__name__} em vez de texto."
+                    if result.ok and result.parser_name is None:
+                        detected, _ = detector.detect(text[:detector.SNIFF_BYTES])
+                        if detected: result.parser_name = detected
+                        else: result.error = "Não foi possível detectar o dialeto do schema."
+                    if result.ok:
+                        result.schema, result.output = await loop.run_in_executor(pool, _map_text, text, result.parser_name)
+                except Exception as e:
+                    result.error = str(e)
+                for sink in sinks:
+                    try:
+                        await sink.write(result)
+                    except Exception as e:
+                        if result.ok: result.error = f"Falha na sink {type(sink).__name__}: {e}"
+                await done.put(result)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            if not cancelled: await done.put(None)
+
+    tasks = [asyncio.create_task(produce())] + [asyncio.create_task(consume()) for _ in range(workers)]
+    completed = False
+    try:
+        finished = 0
+        while finished < workers:
+            result = await done.get()
+            if result is None: finished += 1
+            else: yield result
+        completed = True
+        if source_error: raise source_error[0]
+    finally:
+        for task in tasks: task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if isinstance(executor, str): pool.shutdown(wait=completed, cancel_futures=not completed)
+
+async def run_pipeline(items: Union[AsyncIterable, Iterable], sinks: Sequence = (), **options) -> List[PipelineResult]:
+    return [result async for result in map_schemas(items, sinks, **options)]
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Mapeia de forma assíncrona os schemas de uma pasta para outra.")
+    arg_parser.add_argument("input_dir", help="Pasta com os schemas de origem.")
+    arg_parser.add_argument("output_dir", help="Pasta onde os schemas mapeados são gravados.")
+    arg_parser.add_argument("--parser", help="Força o parser (padrão: detecção por conteúdo).")
+    arg_parser.add_argument("--workers", type=int, default=None, help="Workers do executor (padrão: número de CPUs).")
+    arg_parser.add_argument("--executor", choices=["process", "thread"], default="process", help="Tipo de pool do mapeamento.")
+    arg_parser.add_argument("--queue-size", type=int, default=None, help="Itens lidos à frente do mapeamento (padrão: 2 x workers).")
+    arg_parser.add_argument("--binary", action="store_true", help=f"Também grava o schema no formato binário ('{BINARY_EXTENSION}').")
+    args = arg_parser.parse_args()
+
+    async def run():
+        failures = 0
+        source = directory_source(args.input_dir, parser_name=args.parser)
+        async for result in map_schemas(source, [DirectorySink(args.output_dir, args.binary)], workers=args.workers,
+                                        executor=args.executor, queue_size=args.queue_size):
+            if result.ok: print(f"'{result.name}' mapeado com o parser '{result.parser_name}'.")
+            else: failures += 1; print(f"ERRO ao processar '{result.name}': {result.error}")
+        return failures
+    raise SystemExit(1 if asyncio.run(run()) else 0)
@@ -0,0 +1,111 @@
+import concurrent.futures
+import cProfile
+import os
+from dataclasses import dataclass, field
+from functools import partial
+from typing import List, Optional, Sequence
+from models import IntermediateSchema
+from tool import MapperTool
+from generator import SchemaGenerator
+from cache import SchemaCache
+from instrumentation import Metrics, StageRecord, maybe_stage
+
+@dataclass
+class MappingJob:
+    input_path: str
+    output_path: str
+    parser_name: str
+
+@dataclass
+class MappingResult:
+    job: MappingJob
+    schema: Optional[IntermediateSchema] = None
+    error: Optional[str] = None
+    cache_key: Optional[str] = None
+    cached: bool = False
+    metrics: List[StageRecord] = field(default_factory=list)
+    profile_path: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+# Instâncias reaproveitadas por processo/thread de trabalho (parsers e gerador não guardam estado entre chamadas)
+_tool: Optional[MapperTool] = None
+_generator: Optional[SchemaGenerator] = None
+
+def _get_workers():
+    global _tool, _generator
+    if _tool is None: _tool = MapperTool()
+    if _generator is None: _generator = SchemaGenerator()
+    return _tool, _generator
+
+def map_job(job: MappingJob, cache: Optional[SchemaCache] = None, rebuild: bool = False,
+            collect_metrics: bool = False, track_memory: bool = False, profile_dir: Optional[str] = None) -> MappingResult:
+    # Com collect_metrics, os registros por etapa voltam no resultado (o Metrics do worker não é compartilhado
+    # entre processos); com profile_dir, o job inteiro roda sob cProfile e as estatísticas vão para um .prof
+    metrics = Metrics(track_memory=track_memory) if collect_metrics else None
+    profiler = cProfile.Profile() if profile_dir else None
+    if profiler: profiler.enable()
+    try:
+        result = _map_job(job, cache, rebuild, metrics)
+    finally:
+        if profiler: profiler.disable()
+    if metrics is not None: result.metrics = metrics.records
+    if profiler:
+        os.makedirs(profile_dir, exist_ok=True)
+        result.profile_path = os.path.join(profile_dir, os.path.basename(job.input_path) + ".prof")
+        profiler.dump_stats(result.profile_path)
+    return result
+
+def _map_job(job: MappingJob, cache: Optional[SchemaCache], rebuild: bool, metrics: Optional[Metrics]) -> MappingResult:
+    # Cada arquivo é isolado: qualquer erro vira um MappingResult com a mensagem, sem derrubar o lote
+    label = job.input_path
+    try:
+        tool, generator = _get_workers()
+        cache_key = None
+        if cache is not None:
+            with maybe_stage(metrics, "cache_lookup", label):
+                parser_version = getattr(tool.get_parser(job.parser_name), "version", "0")
+                cache_key = SchemaCache.make_file_key(job.input_path, job.parser_name, parser_version, generator.version)
+                cached_entry = None if rebuild else cache.get(cache_key)
+            if cached_entry is not None:
+                intermediate_schema, final_schema_str = cached_entry
+                with open(job.output_path, 'w', encoding='utf-8') as f: f.write(final_schema_str)
+                return MappingResult(job=job, schema=intermediate_schema, cache_key=cache_key, cached=True)
+        with open(job.input_path, 'r', encoding='utf-8') as f:
+            intermediate_schema = tool.map_stream(f, job.parser_name, metrics, label, input_bytes=os.path.getsize(job.input_path))
+        if cache is None:
+            with open(job.output_path, 'w', encoding='utf-8') as f: generator.generate_to(intermediate_schema, f, metrics, label)
+        else:
+            # O cache guarda a saída gerada, então aqui ela é montada em memória uma única vez
+            final_schema_str = generator.generate(intermediate_schema, metrics, label)
+            with open(job.output_path, 'w', encoding='utf-8') as f: f.write(final_schema_str)
+            with maybe_stage(metrics, "cache_store", label):
+                cache.put(cache_key, intermediate_schema, final_schema_str)
+        return MappingResult(job=job, schema=intermediate_schema, cache_key=cache_key)
+    except Exception as e:
+        return MappingResult(job=job, error=str(e))
+
+def run_batch(jobs: Sequence[MappingJob], workers: Optional[int] = None, executor: str = "process",
+              cache: Optional[SchemaCache] = None, rebuild: bool = False, collect_metrics: bool = False,
+              track_memory: bool = False, profile_dir: Optional[str] = None) -> List[MappingResult]:
+    # Mapeia os jobs (em paralelo se workers > 1) e devolve os resultados na mesma ordem de `jobs`
+    jobs = list(jobs)
+    if workers is None: workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(jobs)))
+    worker_fn = partial(map_job, cache=cache, rebuild=rebuild, collect_metrics=collect_metrics, track_memory=track_memory, profile_dir=profile_dir)
+    if workers == 1:
+        return [worker_fn(job) for job in jobs]
+    # Acesso via atributo do pacote: concurrent.futures só importa o pool (e o multiprocessing) quando usado
+    if executor == "process":
+        pool_cls = concurrent.futures.ProcessPoolExecutor
+    elif executor == "thread":
+        pool_cls = concurrent.futures.ThreadPoolExecutor
+    else:
+        raise ValueError(f"Executor '{executor}' desconhecido (use 'process' ou 'thread').")
+    # Lotes maiores amortizam o custo de IPC do pool de processos (ignorado pelo pool de threads)
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with pool_cls(max_workers=workers) as pool:
+        # Executor.map preserva a ordem de entrada, garantindo saída determinística
+        return list(pool.map(worker_fn, jobs, chunksize=chunksize))
@@ -0,0 +1,127 @@
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from models import Property
+from tool import MapperTool
+from generator import SchemaGenerator
+from synthetic import GENERATORS
+import serialization
+
+# Modelo anterior (dataclass com __dict__, details sempre alocado), mantido só como referência de memória
+@dataclass
+class _LegacyProperty:
+    name: str
+    type: str
+    constraints: List[str] = field(default_factory=list)
+    details: Dict = field(default_factory=dict)
+
+def _build_properties(property_cls, count: int) -> list:
+    # Imita os parsers: nome novo por propriedade, tipo recém-criado (upper()), uma restrição e details vazio
+    raw_types = ["int", "str", "date", "float"]
+    return [property_cls(name=f"prop_{i}", type=raw_types[i % 4].upper(), constraints=["REQUIRED" if i % 2 else "OPTIONAL"], details={})
+            for i in range(count)]
+
+def measure_model_memory(count: int = 200_000) -> Dict[str, float]:
+    results = {}
+    for label, property_cls in (("legacy", _LegacyProperty), ("slots", Property)):
+        gc.collect()
+        tracemalloc.start()
+        properties = _build_properties(property_cls, count)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[f"{label}_bytes_per_property"] = round(current / count, 1)
+        del properties
+    results["reduction"] = round(1 - results["slots_bytes_per_property"] / results["legacy_bytes_per_property"], 3)
+    results["count"] = count
+    return results
+
+def _best_time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def _peak_memory(fn) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def benchmark_parsers(dialects: Optional[List[str]] = None, entities: int = 200, properties: int = 10, depth: int = 1,
+                      relationship_density: float = 0.5, repeat: int = 3, seed: int = 0) -> List[Dict]:
+    # Para cada dialeto: gera a entrada sintética e mede parse e geração separadamente (melhor de `repeat`)
+    # e o pico de memória de cada etapa (medido à parte, pois o tracemalloc distorce os tempos)
+    tool, generator = MapperTool(), SchemaGenerator()
+    results = []
+    for dialect in dialects or list(GENERATORS):
+        text = GENERATORS[dialect](entities=entities, properties=properties, depth=depth, relationship_density=relationship_density, seed=seed)
+        schema = tool.map(text, dialect)
+        binary = serialization.dumps(schema)
+        results.append({
+            "dialect": dialect,
+            "entities": entities, "properties": properties, "depth": depth, "relationship_density": relationship_density,
+            "input_bytes": len(text.encode("utf-8")),
+            "parsed_entities": len(schema.entities), "parsed_relationships": len(schema.relationships),
+            "parse_seconds": round(_best_time(lambda: tool.map(text, dialect), repeat), 6),
+            "generate_seconds": round(_best_time(lambda: generator.generate(schema), repeat), 6),
+            # Releitura do schema já mapeado no formato binário, alternativa ao parse da origem
+            "binary_bytes": len(binary),
+            "load_seconds": round(_best_time(lambda: serialization.loads(binary), repeat), 6),
+            "parse_peak_bytes": _peak_memory(lambda: tool.map(text, dialect)),
+            "generate_peak_bytes": _peak_memory(lambda: generator.generate(schema)),
+        })
+    return results
+
+def compare_with_baseline(results: List[Dict], baseline: List[Dict], tolerance: float) -> List[str]:
+    # Aponta métricas que pioraram mais que `tolerance` (fração) em relação a um resultado salvo
+    # com os mesmos parâmetros de entrada
+    regressions = []
+    shape_keys = ("dialect", "entities", "properties", "depth", "relationship_density")
+    baseline_by_shape = {tuple(entry.get(k) for k in shape_keys): entry for entry in baseline}
+    for entry in results:
+        previous = baseline_by_shape.get(tuple(entry[k] for k in shape_keys))
+        if not previous: continue
+        for metric in ("parse_seconds", "generate_seconds", "load_seconds", "parse_peak_bytes", "generate_peak_bytes"):
+            if previous.get(metric) and entry.get(metric) is not None and entry[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(f"{entry['dialect']}.{metric}: {previous[metric]} -> {entry[metric]}")
+    return regressions
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Benchmarks do PolySchema.")
+    arg_parser.add_argument("suite", choices=["models", "parsers"], help="Benchmark a executar.")
+    arg_parser.add_argument("--count", type=int, default=200_000, help="[models] Número de propriedades criadas.")
+    arg_parser.add_argument("--dialects", nargs="+", choices=list(GENERATORS), help="[parsers] Dialetos medidos (padrão: todos).")
+    arg_parser.add_argument("--entities", type=int, default=200, help="[parsers] Entidades por schema sintético.")
+    arg_parser.add_argument("--properties", type=int, default=10, help="[parsers] Propriedades por entidade.")
+    arg_parser.add_argument("--depth", type=int, default=1, help="[parsers] Profundidade de aninhamento (jfuse/redis).")
+    arg_parser.add_argument("--relationship-density", type=float, default=0.5, help="[parsers] Fração de entidades com relação/FK.")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="[parsers] Repetições por medição (vale o melhor tempo).")
+    arg_parser.add_argument("--seed", type=int, default=0, help="[parsers] Semente dos geradores sintéticos.")
+    arg_parser.add_argument("--output", help="Grava o resultado JSON neste arquivo (além de imprimir).")
+    arg_parser.add_argument("--baseline", help="[parsers] JSON de uma execução anterior para detectar regressões.")
+    arg_parser.add_argument("--tolerance", type=float, default=0.2, help="[parsers] Piora tolerada em relação ao baseline (fração).")
+    args = arg_parser.parse_args()
+
+    if args.suite == "models":
+        report = measure_model_memory(args.count)
+    else:
+        report = benchmark_parsers(args.dialects, args.entities, args.properties, args.depth, args.relationship_density, args.repeat, args.seed)
+    report_str = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f: f.write(report_str)
+    print(report_str)
+    if args.suite == "parsers" and args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f: baseline = json.load(f)
+        regressions = compare_with_baseline(report, baseline, args.tolerance)
+        for regression in regressions: print(f"REGRESSÃO: {regression}", file=sys.stderr)
+        if regressions: sys.exit(1)
@@ -0,0 +1,89 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from typing import Dict, Iterable, Optional, Tuple
+from models import IntermediateSchema
+
+CACHE_FORMAT_VERSION = "3"
+
+class SchemaCache:
+    # Cache em disco do mapeamento de um arquivo: chave = hash do conteúdo + parser + versões de parser/gerador.
+    # Cada entrada é um pickle (IntermediateSchema, saída gerada); o index.json liga cada arquivo de origem
+    # à sua chave atual, o que permite remover entradas obsoletas e de arquivos que sumiram.
+    INDEX_FILENAME = "index.json"
+
+    def __init__(self, cache_dir: str = ".polyschema_cache"):
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def _new_digest(parser_name: str, parser_version: str, generator_version: str):
+        digest = hashlib.sha256()
+        for part in (CACHE_FORMAT_VERSION, parser_name, parser_version, generator_version):
+            digest.update(part.encode('utf-8')); digest.update(b'\0')
+        return digest
+
+    @staticmethod
+    def make_file_key(path: str, parser_name: str, parser_version: str, generator_version: str, chunk_size: int = 1 << 20) -> str:
+        # Hash dos bytes do arquivo (sem tradução de fim de linha), calculado em blocos sem carregar o arquivo inteiro
+        digest = SchemaCache._new_digest(parser_name, parser_version, generator_version)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''): digest.update(chunk)
+        return digest.hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def get(self, key: str) -> Optional[Tuple[IntermediateSchema, str]]:
+        try:
+            with open(self._entry_path(key), 'rb') as f: return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            # Entrada ausente ou corrompida é tratada como miss
+            return None
+
+    def put(self, key: str, schema: IntermediateSchema, output: str):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Escrita atômica: workers paralelos podem gravar a mesma chave ao mesmo tempo
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f: pickle.dump((schema, output), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._entry_path(key))
+        except BaseException:
+            if os.path.exists(tmp_path): os.remove(tmp_path)
+            raise
+
+    def _load_index(self) -> Dict[str, str]:
+        try:
+            with open(os.path.join(self.cache_dir, self.INDEX_FILENAME), 'r', encoding='utf-8') as f: return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index: Dict[str, str]):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        index_path = os.path.join(self.cache_dir, self.INDEX_FILENAME)
+        with open(index_path + ".tmp", 'w', encoding='utf-8') as f: json.dump(index, f, indent=1, sort_keys=True)
+        os.replace(index_path + ".tmp", index_path)
+
+    def update_index(self, source_keys: Dict[str, str]) -> int:
+        # Registra a chave atual de cada arquivo de origem e remove entradas que ficaram sem referência
+        # (arquivos de origem apagados ou cujo conteúdo/versão mudou). Retorna o número de entradas removidas.
+        index = self._load_index()
+        index.update({os.path.abspath(path): key for path, key in source_keys.items()})
+        index = {path: key for path, key in index.items() if os.path.exists(path)}
+        self._save_index(index)
+        return self._evict(set(index.values()))
+
+    def _evict(self, live_keys: Iterable[str]) -> int:
+        live_keys = set(live_keys)
+        evicted = 0
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith(".pkl") and filename[:-4] not in live_keys:
+                os.remove(os.path.join(self.cache_dir, filename)); evicted += 1
+        return evicted
+
+    def clear(self):
+        if not os.path.isdir(self.cache_dir): return
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith((".pkl", ".tmp")) or filename == self.INDEX_FILENAME:
+                os.remove(os.path.join(self.cache_dir, filename))
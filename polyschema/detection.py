@@ -0,0 +1,29 @@
+import re
+
+# Detectores de dialeto por conteúdo: recebem apenas o início do arquivo (alguns KB) e devolvem
+# uma confiança entre 0 e 1. São registrados junto com os parsers em MapperTool.register_parser.
+
+_GRAPH_TYPE_PATTERN = re.compile(r"CREATE\s+GRAPH\s+TYPE\b", re.IGNORECASE)
+_GRAPH_NODE_PATTERN = re.compile(r"\(\s*\w+\s*:\s*\w+(?:\s*&\s*\w+)?\s*\{")
+_JFUSE_ROOT_PATTERN = re.compile(r"^\s*root\s*::=", re.MULTILINE)
+_JFUSE_RULE_PATTERN = re.compile(r"^\s*\w+\s*::=", re.MULTILINE)
+_CREATE_TABLE_PATTERN = re.compile(r"CREATE\s+(?:\w+\s+)*?TABLE\b", re.IGNORECASE)
+_SQL_STATEMENT_PATTERN = re.compile(r"^\s*(?:CREATE|ALTER|SET|INSERT|COMMENT|SELECT)\s", re.IGNORECASE | re.MULTILINE)
+
+def detect_gpfuse(head: str) -> float:
+    if _GRAPH_TYPE_PATTERN.search(head): return 0.95
+    return 0.5 if _GRAPH_NODE_PATTERN.search(head) else 0.0
+
+def detect_jfuse(head: str) -> float:
+    if _JFUSE_ROOT_PATTERN.search(head): return 0.95
+    return 0.7 if _JFUSE_RULE_PATTERN.search(head) else 0.0
+
+def detect_redis(head: str) -> float:
+    if not head.lstrip().startswith('{'): return 0.0
+    if '"properties"' in head or '"$schema"' in head: return 0.9
+    return 0.5
+
+def detect_relational(head: str) -> float:
+    if _GRAPH_TYPE_PATTERN.search(head): return 0.0
+    if _CREATE_TABLE_PATTERN.search(head): return 0.9
+    return 0.4 if _SQL_STATEMENT_PATTERN.search(head) else 0.0
@@ -0,0 +1,349 @@
+import bisect
+import copy
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from models import Entity, Property, Relationship, KeyConstraint, IntermediateSchema
+from merge import SchemaMerger, normalize_name
+
+# Diff estrutural entre duas versões de um IntermediateSchema. Cada entidade recebe uma impressão digital
+# estável (blake2b da forma canônica); só as entidades cujas impressões diferem são comparadas propriedade
+# a propriedade. As impressões podem ser guardadas (dump_fingerprints, ao lado do .psb da origem) e
+# repassadas a diff_schemas para não recalculá-las; junto delas vai a chave da origem, com a qual
+# source_unchanged identifica as origens que nem precisam ser comparadas.
+
+FINGERPRINT_EXTENSION = ".psf"
+_FINGERPRINT_VERSION = 2
+
+def _property_key(prop: Property) -> Tuple:
+    details = prop._details or {}
+    nested = tuple(_property_key(p) for p in details.get('nested_properties', ()))
+    others = tuple(sorted((k, repr(v)) for k, v in details.items() if k != 'nested_properties'))
+    return (prop.name, prop.type, tuple(prop.constraints), nested, others)
+
+def entity_fingerprint(entity: Entity) -> str:
+    canonical = (entity.name, entity.entity_type, entity.extends, entity.original_type_name, tuple(_property_key(p) for p in entity.properties))
+    return hashlib.blake2b(repr(canonical).encode('utf-8'), digest_size=16).hexdigest()
+
+def fingerprint_schema(schema: IntermediateSchema) -> Dict[str, str]:
+    return {name: entity_fingerprint(entity) for name, entity in schema.entities.items()}
+
+def fingerprint_path(binary_path: str) -> str:
+    return os.path.splitext(binary_path)[0] + FINGERPRINT_EXTENSION
+
+def _file_digest(path: str) -> str:
+    with open(path, 'rb') as f: return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+def dump_fingerprints(fingerprints: Dict[str, str], binary_path: str, source_key: Optional[str] = None):
+    # Duas linhas JSON ao lado do .psb: cabeçalho e impressões. O cabeçalho guarda o hash do .psb, para que um
+    # .psb regravado sem as impressões (ex.: --binary sem --incremental) faça load_fingerprints descartá-las em
+    # vez de devolver as de outra versão, e a chave (do SchemaCache) da origem que gerou o .psb
+    path = fingerprint_path(binary_path)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({"version": _FINGERPRINT_VERSION, "binary": _file_digest(binary_path), "source": source_key}) + "\n")
+        json.dump(fingerprints, f)
+    os.replace(tmp_path, path)
+
+def load_fingerprints(binary_path: str) -> Optional[Dict[str, str]]:
+    # None quando não há impressões guardadas ou elas não correspondem ao .psb atual
+    try:
+        with open(fingerprint_path(binary_path), 'r', encoding='utf-8') as f:
+            header = json.loads(f.readline())
+            if header["version"] == _FINGERPRINT_VERSION and header["binary"] == _file_digest(binary_path): return json.loads(f.readline())
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+def source_unchanged(binary_path: str, source_key: Optional[str]) -> bool:
+    # True se o .psb foi gravado (com as impressões) a partir da origem com esta mesma chave: lê só o cabeçalho,
+    # sem abrir o .psb nem as impressões. Quem regrava o .psb por fora do --incremental apaga as impressões.
+    if source_key is None: return False
+    try:
+        with open(fingerprint_path(binary_path), 'r', encoding='utf-8') as f: header = json.loads(f.readline())
+        return header["version"] == _FINGERPRINT_VERSION and header["source"] == source_key and os.path.exists(binary_path)
+    except (OSError, ValueError, KeyError, TypeError):
+        return False
+
+def _relationship_id(rel: Relationship) -> Tuple[str, str, str]:
+    return (rel.name, rel.source_entity, rel.target_entity)
+
+def _key_id(key: KeyConstraint) -> Tuple:
+    return (key.entity_name, key.constraint_name, tuple(key.properties))
+
+@dataclass
+class EntityDiff:
+    old: Entity
+    new: Entity
+    added_properties: List[Property] = field(default_factory=list)
+    removed_properties: List[Property] = field(default_factory=list)
+    changed_properties: List[Tuple[Property, Property]] = field(default_factory=list)
+
+    @property
+    def name(self) -> str:
+        return self.new.name
+
+@dataclass
+class SchemaDiff:
+    added_entities: List[Entity] = field(default_factory=list)
+    removed_entities: List[Entity] = field(default_factory=list)
+    changed_entities: List[EntityDiff] = field(default_factory=list)
+    added_relationships: List[Relationship] = field(default_factory=list)
+    removed_relationships: List[Relationship] = field(default_factory=list)
+    changed_relationships: List[Tuple[Relationship, Relationship]] = field(default_factory=list)
+    added_keys: List[KeyConstraint] = field(default_factory=list)
+    removed_keys: List[KeyConstraint] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return (len(self.added_entities) + len(self.removed_entities) + len(self.changed_entities) + len(self.added_relationships) +
+                len(self.removed_relationships) + len(self.changed_relationships) + len(self.added_keys) + len(self.removed_keys))
+
+    def summary(self) -> str:
+        return (f"entidades +{len(self.added_entities)} -{len(self.removed_entities)} ~{len(self.changed_entities)}, "
+                f"relações +{len(self.added_relationships)} -{len(self.removed_relationships)} ~{len(self.changed_relationships)}, "
+                f"chaves +{len(self.added_keys)} -{len(self.removed_keys)}")
+
+def _diff_entity(old: Entity, new: Entity) -> EntityDiff:
+    change = EntityDiff(old, new)
+    old_properties = {p.name: p for p in old.properties}
+    for prop in new.properties:
+        previous = old_properties.pop(prop.name, None)
+        if previous is None: change.added_properties.append(prop)
+        elif _property_key(previous) != _property_key(prop): change.changed_properties.append((previous, prop))
+    change.removed_properties.extend(old_properties.values())
+    return change
+
+def diff_schemas(old: IntermediateSchema, new: IntermediateSchema, old_fingerprints: Optional[Dict[str, str]] = None,
+                 new_fingerprints: Optional[Dict[str, str]] = None) -> SchemaDiff:
+    old_fingerprints = old_fingerprints if old_fingerprints is not None else fingerprint_schema(old)
+    new_fingerprints = new_fingerprints if new_fingerprints is not None else fingerprint_schema(new)
+    diff = SchemaDiff()
+    for name, entity in new.entities.items():
+        previous = old.entities.get(name)
+        if previous is None: diff.added_entities.append(entity)
+        elif old_fingerprints.get(name) != new_fingerprints.get(name): diff.changed_entities.append(_diff_entity(previous, entity))
+    diff.removed_entities.extend(entity for name, entity in old.entities.items() if name not in new.entities)
+
+    old_relationships = {_relationship_id(rel): rel for rel in old.relationships}
+    for rel in new.relationships:
+        previous = old_relationships.pop(_relationship_id(rel), None)
+        if previous is None: diff.added_relationships.append(rel)
+        elif previous != rel: diff.changed_relationships.append((previous, rel))
+    diff.removed_relationships.extend(old_relationships.values())
+
+    old_keys = {_key_id(key) for key in old.key_constraints}
+    new_keys = {_key_id(key) for key in new.key_constraints}
+    diff.added_keys.extend(key for key in new.key_constraints if _key_id(key) not in old_keys)
+    diff.removed_keys.extend(key for key in old.key_constraints if _key_id(key) not in new_keys)
+    return diff
+
+class SourceIndex:
+    # Entidades, relações e chaves das origens atuais do unificado, por nome normalizado e na ordem da
+    # primeira ocorrência (a mesma da unificação completa). Custa uma passada pelas origens: deve ser montado
+    # uma vez por execução e repassado a apply_diff/apply_diffs, que só o consultam para os itens afetados.
+    def __init__(self, sources: Sequence[IntermediateSchema]):
+        self.entities: Dict[str, List[Entity]] = {}
+        self.relationships: Dict[Tuple, List[Relationship]] = {}
+        self.keys: Dict[Tuple, KeyConstraint] = {}
+        # Relações e chaves de cada entidade (nome normalizado), para acompanhar a troca do nome canônico
+        self.entity_relationships: Dict[str, List[Tuple]] = {}
+        self.entity_keys: Dict[str, List[Tuple]] = {}
+        for schema in sources:
+            for entity in schema.entities.values(): self.entities.setdefault(normalize_name(entity.name), []).append(entity)
+            for rel in schema.relationships:
+                rel_id = _normalized_relationship_id(rel)
+                if rel_id not in self.relationships:
+                    for entity_key in {rel_id[1], rel_id[2]}: self.entity_relationships.setdefault(entity_key, []).append(rel_id)
+                self.relationships.setdefault(rel_id, []).append(rel)
+            for key in schema.key_constraints:
+                key_id = _normalized_key_id(key)
+                if key_id not in self.keys: self.keys[key_id] = key; self.entity_keys.setdefault(key_id[0], []).append(key_id)
+        self._entity_positions = {key: i for i, key in enumerate(self.entities)}
+        self._relationship_positions = {rel_id: i for i, rel_id in enumerate(self.relationships)}
+        self._key_positions = {key_id: i for i, key_id in enumerate(self.keys)}
+
+    def entity_position(self, name: str) -> int:
+        return self._entity_positions.get(normalize_name(name), len(self._entity_positions))
+
+    def relationship_position(self, rel: Relationship) -> int:
+        return self._relationship_positions.get(_normalized_relationship_id(rel), len(self._relationship_positions))
+
+    def key_position(self, key: KeyConstraint) -> int:
+        return self._key_positions.get(_normalized_key_id(key), len(self._key_positions))
+
+    def merged_entity(self, key: str) -> Optional[Entity]:
+        # Mesma mescla da unificação completa, restrita às contribuições desta entidade
+        contributions = self.entities.get(key)
+        if not contributions: return None
+        merger = SchemaMerger()
+        for entity in contributions: merger.add(IntermediateSchema(entities={entity.name: entity}))
+        return next(iter(merger.schema().entities.values()))
+
+    def merged_relationship(self, rel_id: Tuple) -> Optional[Relationship]:
+        # Idem para uma relação; os nomes das entidades ficam como na primeira origem (quem aplica os resolve)
+        contributions = self.relationships.get(rel_id)
+        if not contributions: return None
+        merger = SchemaMerger()
+        for rel in contributions: merger.add(IntermediateSchema(relationships=[rel]))
+        return merger.schema().relationships[0]
+
+    def reorder(self, target: IntermediateSchema, entity_names: Iterable[str], relationships: Iterable[Relationship], keys: Iterable[KeyConstraint]):
+        # Devolve à posição da unificação completa só os itens afetados (remesclados, acrescentados ou que
+        # mudaram de primeira origem), por busca binária entre os demais, que já estão em ordem
+        moved = set(entity_names)
+        if moved:
+            current = list(target.entities)
+            ordered = [name for name in current if name not in moved]
+            for name in sorted(moved, key=self.entity_position): bisect.insort(ordered, name, key=self.entity_position)
+            if ordered != current:
+                entities = [(name, target.entities[name]) for name in ordered]
+                target.entities.clear(); target.entities.update(entities)
+        _reposition(target.relationships, relationships, self.relationship_position)
+        _reposition(target.key_constraints, keys, self.key_position)
+
+def _reposition(items: List, moved: Iterable, position: Callable[[object], int]):
+    moved = list({id(item): item for item in moved}.values())
+    if not moved: return
+    items.remove_items(moved)
+    for item in sorted(moved, key=position): items.insert(bisect.bisect_right(items, position(item), key=position), item)
+
+def _normalized_relationship_id(rel: Relationship) -> Tuple[str, str, str]:
+    return (normalize_name(rel.name), normalize_name(rel.source_entity), normalize_name(rel.target_entity))
+
+def _normalized_key_id(key: KeyConstraint) -> Tuple:
+    return (normalize_name(key.entity_name), tuple(normalize_name(p) for p in key.properties))
+
+def apply_diff(target: IntermediateSchema, diff: SchemaDiff, strict: bool = False,
+               sources: Optional[Union[SourceIndex, Sequence[IntermediateSchema]]] = None) -> IntermediateSchema:
+    # Aplica `diff` sobre `target` (normalmente o schema unificado) e devolve o próprio `target`. Os nomes são
+    # casados pela forma normalizada, como na mescla. Sem `sources`, uma entidade removida sai inteira e uma
+    # alterada recebe as propriedades da nova versão, o que é exato quando cada entidade de `target` vem de uma
+    # só origem. Com `sources` (SourceIndex ou todas as origens atuais do unificado, já com a nova versão, na
+    # ordem da unificação), cada entidade, relação e chave afetada é remesclada a partir das origens que ainda a
+    # declaram, como na unificação completa. Com strict=True, entidades removidas ou alteradas
+    # que não existem no destino geram ValueError. Quando várias origens mudaram, `sources` já reflete todas
+    # elas: use apply_diffs com os diffs de todas, pois a ordem só é restaurada depois do último.
+    return apply_diffs(target, [diff], strict, sources)
+
+def apply_diffs(target: IntermediateSchema, diffs: Iterable[SchemaDiff], strict: bool = False,
+                sources: Optional[Union[SourceIndex, Sequence[IntermediateSchema]]] = None) -> IntermediateSchema:
+    # Como apply_diff para vários diffs (um por origem alterada). Com `sources`, cada item afetado é remesclado
+    # e reposicionado uma única vez, depois de todos os diffs, em vez de uma vez por diff.
+    diffs = [diff for diff in diffs if len(diff)]
+    if not diffs: return target
+    index = sources if sources is None or isinstance(sources, SourceIndex) else SourceIndex(sources)
+    names = {normalize_name(name): name for name in target.entities}
+    moved_entities: List[str] = []
+    moved_relationships: List[Relationship] = []
+    moved_keys: List[KeyConstraint] = []
+
+    def resolve(entity_name: str) -> str:
+        return names.get(normalize_name(entity_name), entity_name)
+
+    def missing(entity_name: str):
+        if strict: raise ValueError(f"Entidade '{entity_name}' não encontrada no schema de destino.")
+
+    def apply_entities(diff: SchemaDiff):
+        for entity in diff.removed_entities:
+            name = names.pop(normalize_name(entity.name), None)
+            if name is None: missing(entity.name)
+            else: target.remove_entity(name)
+        for entity in diff.added_entities:
+            existing = target.entities.get(resolve(entity.name))
+            if existing is None:
+                target.entities[entity.name] = copy.deepcopy(entity)
+                names[normalize_name(entity.name)] = entity.name
+                continue
+            # Entidade que já veio de outra origem: acrescenta só as propriedades que ela ainda não tem
+            present = {normalize_name(p.name) for p in existing.properties}
+            existing.properties.extend(copy.deepcopy(p) for p in entity.properties if normalize_name(p.name) not in present)
+        for change in diff.changed_entities:
+            existing = target.entities.get(resolve(change.name))
+            if existing is None:
+                missing(change.name)
+                target.entities[change.name] = copy.deepcopy(change.new)
+                names[normalize_name(change.name)] = change.name
+                continue
+            removed = {normalize_name(p.name) for p in change.removed_properties}
+            replacements = {normalize_name(new.name): new for _, new in change.changed_properties}
+            for prop in change.added_properties: replacements[normalize_name(prop.name)] = prop
+            properties = []
+            for prop in existing.properties:
+                key = normalize_name(prop.name)
+                if key in removed: continue
+                properties.append(copy.deepcopy(replacements.pop(key)) if key in replacements else prop)
+            properties.extend(copy.deepcopy(p) for p in replacements.values())
+            existing.properties = properties
+            if change.old.entity_type != change.new.entity_type: existing.entity_type = change.new.entity_type
+            if change.old.extends != change.new.extends: existing.extends = change.new.extends
+
+    def find_relationships(rel: Relationship) -> List[Relationship]:
+        rel_id = _normalized_relationship_id(rel)
+        return [r for r in target.relationships.lookup("source_entity", resolve(rel.source_entity)) if _normalized_relationship_id(r) == rel_id]
+
+    def find_keys(key: KeyConstraint) -> List[KeyConstraint]:
+        columns = [normalize_name(p) for p in key.properties]
+        return [k for k in target.keys_of(resolve(key.entity_name))
+                if k.constraint_name == key.constraint_name or [normalize_name(p) for p in k.properties] == columns]
+
+    if index is None:
+        for diff in diffs:
+            apply_entities(diff)
+            target.relationships.remove_items(r for rel in diff.removed_relationships for r in find_relationships(rel))
+            for old, new in diff.changed_relationships:
+                for rel in find_relationships(old):
+                    # Nome, origem e destino (os campos indexados) não mudam, então a alteração pode ser in-place
+                    rel.cardinality_fwd, rel.cardinality_bwd = new.cardinality_fwd, new.cardinality_bwd
+                    rel.properties = copy.deepcopy(new.properties)
+            for rel in diff.added_relationships:
+                if not find_relationships(rel):
+                    target.relationships.append(Relationship(rel.name, resolve(rel.source_entity), resolve(rel.target_entity),
+                                                             rel.cardinality_fwd, rel.cardinality_bwd, copy.deepcopy(rel.properties)))
+            target.key_constraints.remove_items(k for key in diff.removed_keys for k in find_keys(key))
+            for key in diff.added_keys:
+                if not find_keys(key): target.key_constraints.append(KeyConstraint(resolve(key.entity_name), list(key.properties), key.constraint_name))
+        return target
+
+    affected: Dict[str, str] = {}
+    for diff in diffs:
+        for entity in (*diff.removed_entities, *diff.added_entities, *(c.new for c in diff.changed_entities)):
+            affected.setdefault(normalize_name(entity.name), entity.name)
+    # Entidades cujo nome canônico pode ter mudado: as relações e chaves delas são refeitas junto
+    renamed = set()
+    for key, entity_name in affected.items():
+        merged, current_name = index.merged_entity(key), names.get(key)
+        if merged is None:
+            # Relações e chaves da entidade saem pelas listas de removidos dos próprios diffs
+            if current_name is None: missing(entity_name)
+            else: target.entities.pop(current_name); del names[key]; renamed.add(key)
+            continue
+        if current_name != merged.name: renamed.add(key)
+        if current_name is not None and current_name != merged.name: target.entities.pop(current_name)
+        target.entities[merged.name] = merged; names[key] = merged.name
+        moved_entities.append(merged.name)
+
+    # Relações e chaves afetadas são remescladas a partir das origens que ainda as declaram (a primeira define
+    # nome, cardinalidades e restrição, como na unificação completa) e as que nenhuma origem declara saem
+    rel_ids = {_normalized_relationship_id(rel) for diff in diffs
+               for rel in (*diff.removed_relationships, *diff.added_relationships, *(new for _, new in diff.changed_relationships))}
+    key_ids = {_normalized_key_id(key) for diff in diffs for key in (*diff.removed_keys, *diff.added_keys)}
+    for key in renamed:
+        rel_ids.update(index.entity_relationships.get(key, ())); key_ids.update(index.entity_keys.get(key, ()))
+    if rel_ids:
+        target.relationships.remove_items([rel for rel in target.relationships if _normalized_relationship_id(rel) in rel_ids])
+        for rel_id in rel_ids:
+            merged = index.merged_relationship(rel_id)
+            if merged is None: continue
+            rel = Relationship(merged.name, resolve(merged.source_entity), resolve(merged.target_entity), merged.cardinality_fwd, merged.cardinality_bwd, merged.properties)
+            target.relationships.append(rel); moved_relationships.append(rel)
+    if key_ids:
+        target.key_constraints.remove_items([key for key in target.key_constraints if _normalized_key_id(key) in key_ids])
+        for key_id in key_ids:
+            first = index.keys.get(key_id)
+            if first is None: continue
+            key = KeyConstraint(resolve(first.entity_name), list(first.properties), first.constraint_name)
+            target.key_constraints.append(key); moved_keys.append(key)
+    index.reorder(target, moved_entities, moved_relationships, moved_keys)
+    return target
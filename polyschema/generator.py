@@ -1,52 +1,77 @@
+import io
+from typing import Callable, Optional, TextIO
 from models import IntermediateSchema, Entity, Property, Relationship, KeyConstraint
+from instrumentation import Metrics, maybe_stage
+
+Write = Callable[[str], object]
 
 class SchemaGenerator:
-    def generate(self, schema: IntermediateSchema) -> str:
-        output = [f"SCHEMA {schema.name} {{\n"]
-        for entity in schema.entities.values(): output.append(self._generate_entity(entity))
-        for rel in schema.relationships: output.append(self._generate_relationship(rel, schema))
-        for key in schema.key_constraints: output.append(self._generate_key_constraint(key))
-        output.append("}")
-        return "".join(output)
-    def _generate_entity(self, entity: Entity) -> str:
-        header = f'\tENTITY {entity.name}'
-        if entity.extends: header += f' EXTENDS {entity.extends}'
-        body = [header + " {\n"]
-        body.append(f'\t\t{entity.entity_type.upper()} {{\n')
+    # Incrementar quando o formato gerado mudar, para invalidar entradas do SchemaCache
+    version: str = "1"
+    def generate(self, schema: IntermediateSchema, metrics: Optional[Metrics] = None, label: str = "") -> str:
+        buffer = io.StringIO()
+        self.generate_to(schema, buffer, metrics, label)
+        return buffer.getvalue()
+    def generate_to(self, schema: IntermediateSchema, stream: TextIO, metrics: Optional[Metrics] = None, label: str = ""):
+        # Escreve o schema incrementalmente em qualquer objeto com write(), sem montar a saída em memória
+        with maybe_stage(metrics, "generate", label) as record:
+            write = stream.write
+            write(f"SCHEMA {schema.name} {{\n")
+            self.generate_definitions_to(schema, stream)
+            write("}")
+            if metrics is not None: record.update_counts(schema)
+    def generate_definitions(self, schema: IntermediateSchema) -> str:
+        # Apenas o corpo do SCHEMA (entidades, relações e chaves), reaproveitado pela unificação
+        buffer = io.StringIO()
+        self.generate_definitions_to(schema, buffer)
+        return buffer.getvalue()
+    def generate_definitions_to(self, schema: IntermediateSchema, stream: TextIO):
+        write = stream.write
+        for entity in schema.entities.values(): self._write_entity(entity, write)
+        for rel in schema.relationships: self._write_relationship(rel, schema, write)
+        for key in schema.key_constraints: self._write_key_constraint(key, write)
+    def _write_entity(self, entity: Entity, write: Write):
+        write(f'\tENTITY {entity.name}')
+        if entity.extends: write(f' EXTENDS {entity.extends}')
+        write(f' {{\n\t\t{entity.entity_type.upper()} {{\n')
         if not entity.properties:
-            body.append('\n')
+            write('\n')
         else:
             for prop in entity.properties:
-                body.append(self._generate_property(prop, indent_level=3))
-        body.append(f'\t\t}}\n')
-        body.append("\t}\n")
-        return "".join(body)
-    def _generate_property(self, prop: Property, indent_level: int = 2) -> str:
+                self._write_property(prop, write, indent_level=3)
+        write('\t\t}\n\t}\n')
+    def _write_property(self, prop: Property, write: Write, indent_level: int = 2):
         indent = '\t' * indent_level
-        type_str = prop.type
-        constraints_list = prop.constraints
+        write(f'{indent}{prop.name}: ')
         if prop.type == "ENUM":
             values = '", "'.join(prop.details.get('values', []))
-            type_str = f'ENUM ["{values}"]'
+            write(f'ENUM ["{values}"]')
         elif prop.type == "ARRAY":
             if 'nested_properties' in prop.details:
-                nested_props_str = "".join([self._generate_property(p, indent_level + 1) for p in prop.details['nested_properties']])
-                type_str = f"ARRAY [\n{indent}\tOBJECT {{\n{nested_props_str}{indent}\t}}\n{indent}]"
+                write(f"ARRAY [\n{indent}\tOBJECT {{\n")
+                for nested in prop.details['nested_properties']: self._write_property(nested, write, indent_level + 1)
+                write(f"{indent}\t}}\n{indent}]")
+            elif 'ref' in prop.details:
+                # Referência a um tipo recursivo (ver JFuseParser), em vez de expandi-lo indefinidamente
+                write(f"ARRAY [ {prop.details['ref']} ]")
             else:
-                type_str = f"ARRAY [ STRING ]"
-        constraints = ", ".join(constraints_list) if constraints_list else ""
-        return f'{indent}{prop.name}: {type_str} {{ {constraints} }}\n' if constraints else f'{indent}{prop.name}: {type_str}\n'
-    def _generate_relationship(self, rel: Relationship, schema: IntermediateSchema) -> str:
-        base_rel_str = (f"\tRELATION {rel.name} " f"FROM {rel.source_entity} TO {rel.target_entity}")
+                write("ARRAY [ STRING ]")
+        else:
+            write(prop.type)
+        constraints = ", ".join(prop.constraints)
+        write(f' {{ {constraints} }}\n' if constraints else '\n')
+    def _write_relationship(self, rel: Relationship, schema: IntermediateSchema, write: Write):
+        write(f"\tRELATION {rel.name} FROM {rel.source_entity} TO {rel.target_entity}")
         source_entity_obj = schema.entities.get(rel.source_entity)
         if source_entity_obj and source_entity_obj.entity_type != "RELATIONAL":
-            base_rel_str += f" ({rel.cardinality_fwd}) ; ({rel.cardinality_bwd})"
-        if not rel.properties: return base_rel_str + "\n"
-        body = [" {\n"]
+            write(f" ({rel.cardinality_fwd}) ; ({rel.cardinality_bwd})")
+        if not rel.properties:
+            write("\n")
+            return
+        write(" {\n")
         for prop in rel.properties:
-            body.append(self._generate_property(prop, indent_level=2))
-        body.append("\t}\n")
-        return base_rel_str + "".join(body)
-    def _generate_key_constraint(self, key: KeyConstraint) -> str:
+            self._write_property(prop, write, indent_level=2)
+        write("\t}\n")
+    def _write_key_constraint(self, key: KeyConstraint, write: Write):
         props_str = key.properties[0] if len(key.properties) == 1 else f"({', '.join(key.properties)})"
-        return f"\tCONSTRAINT {key.constraint_name} ON {key.entity_name}.{props_str} IS KEY\n"
\ No newline at end of file
+        write(f"\tCONSTRAINT {key.constraint_name} ON {key.entity_name}.{props_str} IS KEY\n")
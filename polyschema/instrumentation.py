@@ -0,0 +1,97 @@
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterator, List, Optional
+from models import IntermediateSchema
+
+@dataclass
+class StageRecord:
+    stage: str
+    label: str = ""
+    seconds: float = 0.0
+    input_bytes: Optional[int] = None
+    entities: Optional[int] = None
+    properties: Optional[int] = None
+    relationships: Optional[int] = None
+    peak_bytes: Optional[int] = None
+    parser: Optional[str] = None
+
+    def update_counts(self, schema: IntermediateSchema):
+        self.entities, self.properties, self.relationships = schema_counts(schema)
+
+def schema_counts(schema: IntermediateSchema):
+    # (entidades, propriedades incluindo as aninhadas em ARRAY e as de relações, relações)
+    def count(properties) -> int:
+        total = 0
+        for prop in properties:
+            total += 1
+            if prop.type == "ARRAY" and 'nested_properties' in prop.details: total += count(prop.details['nested_properties'])
+        return total
+    properties = sum(count(e.properties) for e in schema.entities.values()) + sum(count(r.properties) for r in schema.relationships)
+    return len(schema.entities), properties, len(schema.relationships)
+
+def maybe_stage(metrics: Optional["Metrics"], stage: str, label: str = "", **fields):
+    # Contexto de etapa quando há coleta de métricas; sem Metrics devolve um registro descartável
+    return metrics.stage(stage, label, **fields) if metrics is not None else nullcontext(StageRecord(stage=stage, label=label))
+
+class Metrics:
+    # Coleta tempo de parede (e, com track_memory, pico de memória via tracemalloc) por arquivo e por etapa.
+    # `on_record` é chamado a cada etapa concluída; report()/dump_json() resumem o que foi coletado.
+    def __init__(self, on_record: Optional[Callable[[StageRecord], None]] = None, track_memory: bool = False):
+        self.records: List[StageRecord] = []
+        self.on_record = on_record
+        self.track_memory = track_memory
+
+    @contextmanager
+    def stage(self, stage: str, label: str = "", **fields) -> Iterator[StageRecord]:
+        record = StageRecord(stage=stage, label=label, **fields)
+        started_tracing = False
+        if self.track_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(); started_tracing = True
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.seconds = time.perf_counter() - start
+            if self.track_memory:
+                record.peak_bytes = tracemalloc.get_traced_memory()[1]
+                if started_tracing: tracemalloc.stop()
+            self.add(record)
+
+    def add(self, record: StageRecord):
+        self.records.append(record)
+        if self.on_record: self.on_record(record)
+
+    def extend(self, records: List[StageRecord]):
+        # Usado para juntar os registros devolvidos por workers de outros processos
+        for record in records: self.add(record)
+
+    def report(self) -> Dict:
+        stages: Dict[str, Dict] = {}
+        files: Dict[str, Dict] = {}
+        for record in self.records:
+            stage_total = stages.setdefault(record.stage, {"count": 0, "seconds": 0.0})
+            stage_total["count"] += 1; stage_total["seconds"] += record.seconds
+            if record.label:
+                file_total = files.setdefault(record.label, {"seconds": 0.0, "stages": {}})
+                file_total["seconds"] += record.seconds
+                file_total["stages"][record.stage] = file_total["stages"].get(record.stage, 0.0) + record.seconds
+                for field_name in ("input_bytes", "entities", "properties", "relationships", "parser"):
+                    value = getattr(record, field_name)
+                    if value is not None: file_total[field_name] = value
+                if record.peak_bytes is not None: file_total["peak_bytes"] = max(file_total.get("peak_bytes", 0), record.peak_bytes)
+        return {"stages": stages, "files": files, "records": [asdict(r) for r in self.records]}
+
+    def slowest(self, count: int) -> List[str]:
+        files = self.report()["files"]
+        return sorted(files, key=lambda label: files[label]["seconds"], reverse=True)[:count]
+
+    def dump_json(self, path: str):
+        directory = os.path.dirname(path)
+        if directory: os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f: json.dump(self.report(), f, indent=2)
@@ -1,73 +1,227 @@
+import argparse
 import os
-import re
+import sys
+from typing import List, Optional
+from batch import MappingJob, run_batch
 from tool import MapperTool
-from generator import SchemaGenerator
+from unifier import SchemaUnifier
+from cache import SchemaCache
+from instrumentation import Metrics, maybe_stage
+from serialization import BINARY_EXTENSION, dump_file, load_file
+from models import IntermediateSchema
 
-if __name__ == "__main__":
-    INPUT_DIR, OUTPUT_DIR = "schemas", "result"
-    os.makedirs(INPUT_DIR, exist_ok=True); os.makedirs(OUTPUT_DIR, exist_ok=True)
-    
-    # Etapa 1: Mapeamento individual (gera arquivos na pasta result)
-    tool = MapperTool()
-    generator = SchemaGenerator()
+def main(argv: Optional[List[str]] = None) -> int:
+    # Retorna 0 se todos os arquivos foram mapeados e unificados, 1 caso contrário (para uso em agendadores)
+    arg_parser = argparse.ArgumentParser(description="Mapeia os schemas da pasta de entrada e unifica o resultado na pasta de saída.")
+    arg_parser.add_argument("--input-dir", default="schemas", help="Pasta com os schemas de origem (.txt).")
+    arg_parser.add_argument("--output-dir", default="result", help="Pasta dos schemas mapeados e do schema unificado.")
+    arg_parser.add_argument("--parser", help="Usa este parser para todos os arquivos, sem detecção nem regra por nome.")
+    arg_parser.add_argument("--workers", type=int, default=None, help="Número de workers da Fase 1 (padrão: número de CPUs; 1 = execução serial).")
+    arg_parser.add_argument("--executor", choices=["process", "thread"], default="process", help="Tipo de pool usado quando workers > 1.")
+    arg_parser.add_argument("--include-existing", action="store_true", help="Também unifica arquivos já presentes na pasta de saída que não foram mapeados nesta execução.")
+    arg_parser.add_argument("--cache-dir", default=".polyschema_cache", help="Pasta do cache incremental da Fase 1.")
+    arg_parser.add_argument("--no-cache", action="store_true", help="Desativa o cache incremental.")
+    arg_parser.add_argument("--rebuild", action="store_true", help="Ignora o cache e remapeia todos os arquivos (o cache é regravado).")
+    arg_parser.add_argument("--no-detect", action="store_true", help="Escolhe o parser só pelo nome do arquivo, sem inspecionar o conteúdo.")
+    arg_parser.add_argument("--detect-threshold", type=float, default=0.6, help="Confiança mínima para a detecção por conteúdo prevalecer sobre o nome.")
+    arg_parser.add_argument("--binary", action="store_true", help=f"Também salva cada schema mapeado no formato binário ('{BINARY_EXTENSION}'), relido sem reparse por --include-existing.")
+    arg_parser.add_argument("--dedupe", action="store_true", help="Mescla entidades repetidas entre os schemas (união de propriedades, tipos alargados) em vez de concatená-los.")
+    arg_parser.add_argument("--incremental", action="store_true", help="Atualiza o schema unificado (deduplicado) aplicando só o diff das origens alteradas desde a última execução (com o cache ativo, as inalteradas nem têm o .psb anterior relido).")
+    arg_parser.add_argument("--metrics-json", help="Grava tempos por arquivo/etapa, tamanhos e contagens neste arquivo JSON.")
+    arg_parser.add_argument("--track-memory", action="store_true", help="Mede o pico de memória de cada etapa (tracemalloc; use com pool de processos ou --workers 1).")
+    arg_parser.add_argument("--profile", type=int, default=0, metavar="N", help="Captura cProfile por arquivo e mantém apenas os N arquivos mais lentos.")
+    arg_parser.add_argument("--profile-dir", default="profiles", help="Pasta dos arquivos .prof gerados por --profile.")
+    args = arg_parser.parse_args(argv)
+    if args.incremental and args.include_existing:
+        arg_parser.error("--incremental não pode ser combinado com --include-existing.")
+    collect_metrics = bool(args.metrics_json or args.profile or args.track_memory)
+    metrics = Metrics(track_memory=args.track_memory) if collect_metrics else None
+
+    input_dir, output_dir = args.input_dir, args.output_dir
+    os.makedirs(input_dir, exist_ok=True); os.makedirs(output_dir, exist_ok=True)
     
-    files_to_process = [f for f in os.listdir(INPUT_DIR) if f.endswith(".txt")]
+    # Etapa 1: Mapeamento individual (gera arquivos na pasta de saída)
+    cache = None if args.no_cache else SchemaCache(args.cache_dir)
+    files_to_process = sorted(f for f in os.listdir(input_dir) if f.endswith(".txt"))
+    results = []
     
     if not files_to_process:
-        print(f"Aviso: A pasta '{INPUT_DIR}' está vazia ou não contém arquivos .txt.")
+        print(f"Aviso: A pasta '{input_dir}' está vazia ou não contém arquivos .txt.")
     else:
         print("--- Fase 1: Mapeamento Individual ---")
+        jobs = []
+        tool = MapperTool()
+        if args.parser:
+            try:
+                tool.get_parser(args.parser)
+            except ValueError as e:
+                arg_parser.error(f"{e} Disponíveis: {', '.join(tool.parser_names())}.")
         for filename in files_to_process:
-            input_path = os.path.join(INPUT_DIR, filename)
-            output_path = os.path.join(OUTPUT_DIR, filename)
-            
+            input_path = os.path.join(input_dir, filename)
             parser_to_use = "gpfuse"
             if "jfuse" in filename.lower(): parser_to_use = "jfuse"
             elif "redis" in filename.lower(): parser_to_use = "redis"
             elif "relational" in filename.lower(): parser_to_use = "relational"
-            
-            print(f"Processando '{input_path}' usando o parser '{parser_to_use}'...")
-            try:
-                with open(input_path, 'r', encoding='utf-8') as f: schema_text = f.read()
-                intermediate_schema = tool.map(schema_text, parser_to_use)
-                final_schema_str = generator.generate(intermediate_schema)
-                with open(output_path, 'w', encoding='utf-8') as f: f.write(final_schema_str)
-                print(f"Mapeamento concluído. Resultado salvo em '{output_path}'.\n")
-            except Exception as e:
-                print(f"ERRO ao processar o arquivo {filename}: {e}\n")
+            if args.parser:
+                parser_to_use = args.parser
+            elif not args.no_detect:
+                # O conteúdo prevalece sobre o nome do arquivo quando a detecção é confiável
+                detected, confidence = tool.detect_file(input_path)
+                if detected and confidence >= args.detect_threshold:
+                    if detected != parser_to_use:
+                        print(f"Aviso: '{filename}' parece ser '{detected}' (confiança {confidence:.2f}), não '{parser_to_use}'.")
+                    parser_to_use = detected
+            jobs.append(MappingJob(input_path, os.path.join(output_dir, filename), parser_to_use))
+        
+        results = run_batch(jobs, workers=args.workers, executor=args.executor, cache=cache, rebuild=args.rebuild,
+                            collect_metrics=collect_metrics, track_memory=args.track_memory,
+                            profile_dir=args.profile_dir if args.profile else None)
+        if metrics is not None:
+            for result in results: metrics.extend(result.metrics)
+        if args.profile:
+            # Mantém só os perfis dos N arquivos mais lentos
+            slowest = set(metrics.slowest(args.profile))
+            for result in results:
+                if result.profile_path and result.job.input_path not in slowest: os.remove(result.profile_path)
+            print(f"Perfis cProfile dos {len(slowest)} arquivo(s) mais lento(s) salvos em '{args.profile_dir}'.\n")
+        for result in results:
+            job = result.job
+            print(f"Processando '{job.input_path}' usando o parser '{job.parser_name}'...")
+            if result.ok and result.cached:
+                print(f"Sem alterações desde a última execução (cache). Resultado salvo em '{job.output_path}'.\n")
+            elif result.ok:
+                print(f"Mapeamento concluído. Resultado salvo em '{job.output_path}'.\n")
+            else:
+                print(f"ERRO ao processar o arquivo {os.path.basename(job.input_path)}: {result.error}\n")
+                continue
+            if args.binary and not args.incremental:
+                # No modo incremental o .psb anterior ainda é necessário para o diff; é regravado na Fase 2
+                binary_path = os.path.splitext(job.output_path)[0] + BINARY_EXTENSION
+                dump_file(result.schema, binary_path)
+                # Impressões de um --incremental anterior descreveriam outro .psb: ficam inválidas
+                from diff import fingerprint_path
+                if os.path.exists(fingerprint_path(binary_path)): os.remove(fingerprint_path(binary_path))
+                print(f"Schema binário salvo em '{binary_path}'.\n")
+
+    if cache is not None:
+        evicted = cache.update_index({r.job.input_path: r.cache_key for r in results if r.cache_key})
+        if evicted: print(f"{evicted} entrada(s) obsoleta(s) removida(s) do cache '{cache.cache_dir}'.\n")
 
-    # Etapa 2: Unificação dos schemas da pasta result/
+    # Etapa 2: Unificação dos schemas mapeados na Fase 1 (em memória, sem reler a pasta result/)
     print("--- Fase 2: Unificação dos Schemas ---")
     
     unified_filename = "unified_schema.txt"
-    all_definitions = []
+    unified_binary_path = os.path.join(output_dir, os.path.splitext(unified_filename)[0] + BINARY_EXTENSION)
+    unifier = SchemaUnifier("UnifiedPolySchema")
     
-    result_files = [f for f in os.listdir(OUTPUT_DIR) if f.endswith(".txt") and f != unified_filename]
+    mapped_schemas = {os.path.basename(r.job.output_path): r.schema for r in results if r.ok}
+    # Versões binárias de cada origem: as da execução anterior servem de base para o diff incremental
+    source_binaries = {os.path.splitext(r.job.output_path)[0] + BINARY_EXTENSION: r.schema for r in results if r.ok}
+    # Chave do cache de cada origem (None sem cache): igual à guardada nas impressões = origem sem alteração
+    source_keys = {os.path.splitext(r.job.output_path)[0] + BINARY_EXTENSION: r.cache_key for r in results if r.ok}
+    failed_binaries = {os.path.splitext(r.job.output_path)[0] + BINARY_EXTENSION for r in results if not r.ok}
+    previous_binaries = sorted(os.path.join(output_dir, f) for f in os.listdir(output_dir)
+                               if f.endswith(BINARY_EXTENSION) and os.path.join(output_dir, f) != unified_binary_path)
+    incremental_base = args.incremental and not args.rebuild and os.path.exists(unified_binary_path)
+    if args.include_existing:
+        # Fallback opcional: arquivos gerados em execuções anteriores que não foram remapeados agora
+        # O binário, quando existe, tem preferência sobre o texto gerado (mesmo nome base)
+        for filename in sorted(os.listdir(output_dir), key=lambda name: not name.endswith(BINARY_EXTENSION)):
+            stem, extension = os.path.splitext(filename)
+            if extension not in (".txt", BINARY_EXTENSION) or stem + ".txt" in (unified_filename, *mapped_schemas): continue
+            mapped_schemas[stem + ".txt"] = os.path.join(output_dir, filename)
 
-    if not result_files:
-        print(f"Nenhum arquivo encontrado em '{OUTPUT_DIR}' para unificar.")
+    unified_schema = None
+    # Origens sem alteração desde a execução anterior (mantêm .psb e impressões) e impressões das demais
+    unchanged_binaries = set()
+    source_fingerprints = {}
+    if incremental_base:
+        # Importados só aqui (e na mescla abaixo): a maioria das execuções não paga por eles na inicialização
+        from diff import SourceIndex, apply_diffs, diff_schemas, fingerprint_schema, load_fingerprints, source_unchanged
+        unified_schema = load_file(unified_binary_path, use_mmap=True)
+        diffs = []
+        with maybe_stage(metrics, "diff"):
+            # Origens com a mesma chave da execução anterior ficam de fora sem ler o .psb; só os .psb anteriores
+            # das alteradas, das removidas (sem origem atual) e das que falharam agora (mantêm a versão anterior)
+            # são carregados
+            unchanged_binaries = {path for path in source_binaries if source_unchanged(path, source_keys[path])}
+            changed = sorted((set(source_binaries) | set(previous_binaries)) - failed_binaries - unchanged_binaries)
+            previous_schemas = {path: load_file(path, use_mmap=True) for path in previous_binaries if path not in unchanged_binaries}
+            for path in changed:
+                # Impressões da versão anterior vêm do disco (None se ausentes ou de outro .psb: recalculadas)
+                old_fingerprints = load_fingerprints(path) if path in previous_schemas else {}
+                new_fingerprints = fingerprint_schema(source_binaries[path]) if path in source_binaries else {}
+                schema_diff = diff_schemas(previous_schemas.get(path) or IntermediateSchema(), source_binaries.get(path) or IntermediateSchema(),
+                                           old_fingerprints, new_fingerprints)
+                if path in source_binaries: source_fingerprints[path] = new_fingerprints
+                if not schema_diff: continue
+                diffs.append(schema_diff)
+                print(f"Diff de '{path}': {schema_diff.summary()}")
+            if diffs:
+                # Estado atual de cada origem, na ordem da unificação completa, já em memória desde a Fase 1: origens
+                # que falharam agora mantêm a versão anterior. O índice é montado uma única vez e cada item
+                # afetado é remesclado uma vez só
+                current_sources = [source_binaries[path] if path in source_binaries else previous_schemas[path]
+                                   for path in sorted(set(source_binaries) | (failed_binaries & set(previous_schemas)))]
+                apply_diffs(unified_schema, diffs, sources=SourceIndex(current_sources))
+        print(f"Unificação incremental: {len(diffs)} origem(ns) alterada(s) aplicada(s) ao schema unificado anterior, {len(unchanged_binaries)} sem alteração.")
+        unifier.add_schema(unified_schema)
+    elif not mapped_schemas:
+        print("Nenhum schema mapeado para unificar.")
     else:
-        print(f"Unificando {len(result_files)} arquivo(s) de '{OUTPUT_DIR}'...")
-        for filename in result_files:
-            filepath = os.path.join(OUTPUT_DIR, filename)
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
-                inner_content_match = re.search(r"SCHEMA\s+.*?\{(.*)\}", content, re.DOTALL)
-                
-                if inner_content_match:
-                    inner_content = inner_content_match.group(1).strip()
-                    all_definitions.append('\t' + inner_content)
-        
-        # Monta o arquivo final
-        unified_content = "\n\n".join(all_definitions)
-        final_output_str = f"SCHEMA UnifiedPolySchema {{\n{unified_content}\n}}"
-        
-        unified_output_path = os.path.join(OUTPUT_DIR, unified_filename)
+        print(f"Unificando {len(mapped_schemas)} schema(s)...")
+        merger = None
+        if args.dedupe or args.incremental:
+            from merge import SchemaMerger
+            merger = SchemaMerger("UnifiedPolySchema")
+        for filename in sorted(mapped_schemas):
+            source = mapped_schemas[filename]
+            if merger is not None and isinstance(source, str) and source.endswith(BINARY_EXTENSION):
+                merger.add(load_file(source, use_mmap=True))
+            elif isinstance(source, str) and source.endswith(BINARY_EXTENSION): unifier.add_binary_file(source)
+            elif isinstance(source, str):
+                # Saída textual de execuções anteriores não tem estrutura para mesclar: entra concatenada
+                if merger is not None: print(f"Aviso: '{filename}' não tem schema binário e será unificado sem deduplicação.")
+                unifier.add_generated_file(source)
+            elif merger is not None: merger.add(source)
+            else: unifier.add_schema(source)
+        if merger is not None:
+            with maybe_stage(metrics, "merge"):
+                merged_schema = merger.schema()
+            unifier.add_schema(merged_schema)
+            unified_schema = merged_schema
+            print(f"Deduplicação: {merger.duplicates} entidade(s) idêntica(s) descartada(s), {merger.merged} mesclada(s), {len(merger.conflicts)} conflito(s).")
+            for issue in merger.issues: print(f"  {issue}")
+
+    unify_failed = False
+    if len(unifier):
+        unified_output_path = os.path.join(output_dir, unified_filename)
         try:
-            with open(unified_output_path, 'w', encoding='utf-8') as f:
-                f.write(final_output_str)
+            with open(unified_output_path, 'w', encoding='utf-8') as f, maybe_stage(metrics, "unify"):
+                unifier.generate_to(f)
             print(f"Unificação concluída. Resultado salvo em '{unified_output_path}'.\n")
         except Exception as e:
             print(f"ERRO ao salvar o arquivo unificado: {e}")
+            unify_failed = True
 
-    print("Processamento de todos os arquivos concluído.")
\ No newline at end of file
+    if args.incremental and unified_schema is not None:
+        # Base da próxima execução: o unificado e a versão atual de cada origem, com as impressões digitais das
+        # entidades ao lado; origens sem alteração ficam com os arquivos da execução anterior
+        from diff import dump_fingerprints, fingerprint_path, fingerprint_schema
+        dump_file(unified_schema, unified_binary_path)
+        for path, schema in source_binaries.items():
+            if path in unchanged_binaries: continue
+            dump_file(schema, path)
+            dump_fingerprints(source_fingerprints.get(path) or fingerprint_schema(schema), path, source_keys[path])
+        for path in set(previous_binaries) - set(source_binaries) - failed_binaries:
+            os.remove(path)
+            if os.path.exists(fingerprint_path(path)): os.remove(fingerprint_path(path))
+
+    if args.metrics_json:
+        metrics.dump_json(args.metrics_json)
+        print(f"Métricas salvas em '{args.metrics_json}'.")
+    print("Processamento de todos os arquivos concluído.")
+    return 1 if unify_failed or any(not r.ok for r in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,217 @@
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+from models import Entity, Property, Relationship, KeyConstraint, IntermediateSchema, PropertyType, Constraint
+
+# Mescla estrutural de vários IntermediateSchema: entidades com o mesmo nome normalizado (sem caixa nem
+# separadores: PoeDetail == poe_detail) viram uma só, com a união das propriedades. Tudo é indexado por
+# dicionário, então o custo é linear no tamanho das entradas; entidades idênticas a uma já vista (mesma
+# assinatura) são descartadas sem comparar propriedade a propriedade.
+
+_NAME_NORMALIZER = re.compile(r"[^0-9a-z]")
+_SCALAR_TYPES = {PropertyType.STRING, PropertyType.NUMBER, PropertyType.BOOLEAN, PropertyType.DATE, PropertyType.ENUM}
+
+def normalize_name(name: str) -> str:
+    return _NAME_NORMALIZER.sub("", name.casefold())
+
+def widen_type(a: str, b: str) -> Optional[str]:
+    # Menor tipo que comporta os dois: NULL some diante de qualquer tipo, escalares diferentes viram STRING.
+    # None quando não há alargamento possível (ARRAY contra escalar)
+    if a == b: return a
+    if a == PropertyType.NULL: return b
+    if b == PropertyType.NULL: return a
+    if a in _SCALAR_TYPES and b in _SCALAR_TYPES: return PropertyType.STRING
+    return None
+
+def property_signature(prop: Property) -> Tuple:
+    details = prop._details or {}
+    nested = tuple(property_signature(p) for p in details.get('nested_properties', ()))
+    others = tuple(sorted((k, repr(v)) for k, v in details.items() if k != 'nested_properties'))
+    return (normalize_name(prop.name), prop.type, tuple(prop.constraints), nested, others)
+
+def entity_signature(entity: Entity) -> bytes:
+    # Independe da ordem das propriedades. blake2b da forma canônica (como as impressões do diff), não hash():
+    # uma colisão de 64 bits descartaria em silêncio uma entidade diferente como duplicata
+    canonical = (normalize_name(entity.name), entity.entity_type, entity.extends, tuple(sorted(property_signature(p) for p in entity.properties)))
+    return hashlib.blake2b(repr(canonical).encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+@dataclass
+class MergeIssue:
+    kind: str                       # "type", "array", "entity_type" ou "cardinality"
+    entity: str
+    detail: str
+    property: Optional[str] = None
+    conflict: bool = True           # False: apenas informativo (ex.: tipo alargado)
+
+    def __str__(self):
+        target = f"{self.entity}.{self.property}" if self.property else self.entity
+        return f"{'Conflito' if self.conflict else 'Aviso'} em {target} ({self.kind}): {self.detail}"
+
+class _MergedProperty:
+    __slots__ = ("name", "type", "details", "nested", "seen", "required", "optional", "extra", "owner", "issues")
+
+    def __init__(self, prop: Property, owner: str, issues: List[MergeIssue]):
+        self.name, self.type, self.owner, self.issues = prop.name, prop.type, owner, issues
+        details = prop._details or {}
+        self.details = {k: list(v) if isinstance(v, list) else v for k, v in details.items() if k != 'nested_properties'}
+        self.nested = None
+        if 'nested_properties' in details: self._merge_nested(details['nested_properties'])
+        self.seen, self.required, self.optional, self.extra = 0, False, False, []
+        self._absorb_constraints(prop)
+
+    def _absorb_constraints(self, prop: Property):
+        self.seen += 1
+        for constraint in prop.constraints:
+            if constraint == Constraint.REQUIRED: self.required = True
+            elif constraint == Constraint.OPTIONAL: self.optional = True
+            elif constraint not in self.extra: self.extra.append(constraint)
+
+    def _merge_nested(self, properties: List[Property]):
+        if self.nested is None: self.nested = _PropertyMerger(f"{self.owner}.{self.name}", self.issues)
+        self.nested.add(properties)
+
+    def _issue(self, kind: str, detail: str, conflict: bool = True):
+        self.issues.append(MergeIssue(kind, self.owner, detail, self.name, conflict))
+
+    def merge(self, prop: Property):
+        self._absorb_constraints(prop)
+        details = prop._details or {}
+        if prop.type != self.type:
+            widened = widen_type(self.type, prop.type)
+            if widened is None:
+                self._issue("type", f"{self.type} x {prop.type}; mantido {self.type}")
+                return
+            if PropertyType.NULL not in (self.type, prop.type): self._issue("type", f"{self.type} + {prop.type} -> {widened}", conflict=False)
+            if self.type == PropertyType.NULL:
+                self.details = {k: list(v) if isinstance(v, list) else v for k, v in details.items() if k != 'nested_properties'}
+            self.type = widened
+            if widened != PropertyType.ENUM: self.details.pop('values', None)
+        elif self.type == PropertyType.ENUM:
+            values = self.details.setdefault('values', [])
+            values.extend(v for v in details.get('values', ()) if v not in values)
+        elif self.type == PropertyType.ARRAY:
+            self._merge_array(details)
+
+    def _merge_array(self, details: Dict):
+        if 'nested_properties' in details:
+            if 'ref' in self.details: self._issue("array", f"ARRAY [ {self.details['ref']} ] x ARRAY de OBJECT")
+            else: self._merge_nested(details['nested_properties'])
+        elif 'ref' in details:
+            if self.nested is not None or self.details.get('ref', details['ref']) != details['ref']:
+                self._issue("array", f"ARRAY [ {self.details.get('ref', 'OBJECT')} ] x ARRAY [ {details['ref']} ]")
+            else: self.details['ref'] = details['ref']
+        if 'inner_type' in details:
+            widened = widen_type(self.details.get('inner_type', details['inner_type']), details['inner_type'])
+            self.details['inner_type'] = widened or self.details['inner_type']
+
+    def build(self, sources: int) -> Property:
+        # REQUIRED só se nenhuma origem disse OPTIONAL e a propriedade veio em todas; OPTIONAL se alguma origem
+        # disse OPTIONAL ou se ela falta em alguma; sem informação em nenhuma origem, fica sem restrição
+        constraints = []
+        if self.required and not self.optional and self.seen >= sources: constraints.append(Constraint.REQUIRED)
+        elif self.required or self.optional or self.seen < sources: constraints.append(Constraint.OPTIONAL)
+        constraints.extend(self.extra)
+        details = dict(self.details)
+        if self.nested is not None: details['nested_properties'] = self.nested.properties()
+        return Property(self.name, self.type, constraints, details)
+
+class _PropertyMerger:
+    def __init__(self, owner: str, issues: List[MergeIssue]):
+        self.owner, self.issues = owner, issues
+        self.sources = 0
+        self.by_name: Dict[str, _MergedProperty] = {}
+
+    def add(self, properties: List[Property]):
+        self.sources += 1
+        for prop in properties:
+            key = normalize_name(prop.name)
+            merged = self.by_name.get(key)
+            if merged is None: self.by_name[key] = _MergedProperty(prop, self.owner, self.issues)
+            else: merged.merge(prop)
+
+    def properties(self) -> List[Property]:
+        return [merged.build(self.sources) for merged in self.by_name.values()]
+
+class _MergedEntity:
+    __slots__ = ("entity", "properties", "signatures")
+
+    def __init__(self, entity: Entity, issues: List[MergeIssue]):
+        self.entity = Entity(entity.name, entity.entity_type, extends=entity.extends, original_type_name=entity.original_type_name)
+        self.properties = _PropertyMerger(entity.name, issues)
+        self.properties.add(entity.properties)
+        self.signatures: Set[bytes] = {entity_signature(entity)}
+
+class SchemaMerger:
+    # Uso: add() para cada schema de origem, na ordem de prioridade (nomes, tipos de entidade e
+    # cardinalidades da primeira ocorrência prevalecem), e schema() para o resultado deduplicado.
+    def __init__(self, name: str = "UnifiedPolySchema"):
+        self.name = name
+        self.issues: List[MergeIssue] = []
+        self.duplicates = 0         # entidades idênticas a uma já vista, descartadas
+        self.merged = 0             # entidades incorporadas a uma de mesmo nome
+        self._entities: Dict[str, _MergedEntity] = {}
+        self._relationships: Dict[Tuple[str, str, str], Tuple[Relationship, _PropertyMerger]] = {}
+        self._keys: Dict[Tuple[str, Tuple[str, ...]], KeyConstraint] = {}
+
+    @property
+    def conflicts(self) -> List[MergeIssue]:
+        return [issue for issue in self.issues if issue.conflict]
+
+    def add(self, schema: IntermediateSchema):
+        for entity in schema.entities.values(): self._add_entity(entity)
+        for rel in schema.relationships: self._add_relationship(rel)
+        for key in schema.key_constraints:
+            signature = (normalize_name(key.entity_name), tuple(normalize_name(p) for p in key.properties))
+            if signature not in self._keys: self._keys[signature] = KeyConstraint(key.entity_name, list(key.properties), key.constraint_name)
+
+    def _add_entity(self, entity: Entity):
+        key = normalize_name(entity.name)
+        merged = self._entities.get(key)
+        if merged is None:
+            self._entities[key] = _MergedEntity(entity, self.issues)
+            return
+        signature = entity_signature(entity)
+        if signature in merged.signatures:
+            self.duplicates += 1
+            return
+        merged.signatures.add(signature)
+        self.merged += 1
+        if entity.entity_type != merged.entity.entity_type:
+            self.issues.append(MergeIssue("entity_type", merged.entity.name, f"{merged.entity.entity_type} x {entity.entity_type}; mantido {merged.entity.entity_type}", conflict=False))
+        if merged.entity.extends is None: merged.entity.extends = entity.extends
+        merged.properties.add(entity.properties)
+
+    def _add_relationship(self, rel: Relationship):
+        key = (normalize_name(rel.name), normalize_name(rel.source_entity), normalize_name(rel.target_entity))
+        existing = self._relationships.get(key)
+        if existing is None:
+            merger = _PropertyMerger(rel.name, self.issues)
+            merger.add(rel.properties)
+            self._relationships[key] = (Relationship(rel.name, rel.source_entity, rel.target_entity, rel.cardinality_fwd, rel.cardinality_bwd), merger)
+            return
+        first, merger = existing
+        if (first.cardinality_fwd, first.cardinality_bwd) != (rel.cardinality_fwd, rel.cardinality_bwd):
+            self.issues.append(MergeIssue("cardinality", rel.name, f"({first.cardinality_fwd}) ; ({first.cardinality_bwd}) x ({rel.cardinality_fwd}) ; ({rel.cardinality_bwd})"))
+        merger.add(rel.properties)
+
+    def _canonical_name(self, entity_name: str) -> str:
+        merged = self._entities.get(normalize_name(entity_name))
+        return merged.entity.name if merged else entity_name
+
+    def schema(self) -> IntermediateSchema:
+        result = IntermediateSchema(name=self.name)
+        for merged in self._entities.values():
+            entity = merged.entity
+            result.entities[entity.name] = Entity(entity.name, entity.entity_type, merged.properties.properties(), entity.extends, entity.original_type_name)
+        result.relationships.extend(
+            Relationship(rel.name, self._canonical_name(rel.source_entity), self._canonical_name(rel.target_entity), rel.cardinality_fwd, rel.cardinality_bwd, merger.properties())
+            for rel, merger in self._relationships.values())
+        result.key_constraints.extend(
+            KeyConstraint(self._canonical_name(key.entity_name), list(key.properties), key.constraint_name) for key in self._keys.values())
+        return result
+
+def merge_schemas(schemas: List[IntermediateSchema], name: str = "UnifiedPolySchema") -> Tuple[IntermediateSchema, List[MergeIssue]]:
+    merger = SchemaMerger(name)
+    for schema in schemas: merger.add(schema)
+    return merger.schema(), merger.issues
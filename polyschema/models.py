@@ -1,14 +1,56 @@
+import sys
 from dataclasses import dataclass, field
-from typing import List, Optional, Dict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Nomes canônicos de tipos e restrições, usados hoje só pelo merge. Os parsers produzem strings soltas
+# (muitas vezes recém-criadas, ex.: "DATE" via upper()); Property as interna com intern_vocabulary,
+# então milhões de propriedades apontam para a mesma string.
+class PropertyType:
+    STRING = "STRING"
+    NUMBER = "NUMBER"
+    BOOLEAN = "BOOLEAN"
+    DATE = "DATE"
+    NULL = "NULL"
+    ENUM = "ENUM"
+    ARRAY = "ARRAY"
+
+class Constraint:
+    REQUIRED = "REQUIRED"
+    OPTIONAL = "OPTIONAL"
+    KEY = "KEY"
+
+def intern_vocabulary(value):
+    return sys.intern(value) if type(value) is str else value
 
-@dataclass
 class Property:
-    name: str
-    type: str
-    constraints: List[str] = field(default_factory=list)
-    details: Dict = field(default_factory=dict)
+    # Classe compacta (slots, sem __dict__); `details` só é alocado no primeiro acesso
+    __slots__ = ("name", "type", "constraints", "_details")
 
-@dataclass
+    def __init__(self, name: str, type: str, constraints: Optional[List[str]] = None, details: Optional[Dict] = None):
+        self.name = name
+        self.type = intern_vocabulary(type)
+        self.constraints = [intern_vocabulary(c) for c in constraints] if constraints else []
+        # Um dict passado (mesmo vazio) é usado como está, para que o chamador possa continuar preenchendo-o
+        self._details = details
+
+    @property
+    def details(self) -> Dict:
+        if self._details is None: self._details = {}
+        return self._details
+
+    @details.setter
+    def details(self, value: Dict):
+        self._details = value
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__: return NotImplemented
+        return ((self.name, self.type, self.constraints, self._details or {}) ==
+                (other.name, other.type, other.constraints, other._details or {}))
+
+    def __repr__(self):
+        return f"Property(name={self.name!r}, type={self.type!r}, constraints={self.constraints!r}, details={self._details or {}!r})"
+
+@dataclass(slots=True)
 class Entity:
     name: str
     entity_type: str = "RELATIONAL"
@@ -16,7 +58,7 @@ class Entity:
     extends: Optional[str] = None
     original_type_name: Optional[str] = None
 
-@dataclass
+@dataclass(slots=True)
 class Relationship:
     name: str
     source_entity: str
@@ -25,15 +67,155 @@ class Relationship:
     cardinality_bwd: str
     properties: List[Property] = field(default_factory=list)
 
-@dataclass
+@dataclass(slots=True)
 class KeyConstraint:
     entity_name: str
     properties: List[str]
     constraint_name: Optional[str] = None
-    
+
+class IndexedList(list):
+    # Lista com índices secundários (valor do campo -> itens, na ordem de inserção) mantidos a cada mutação.
+    # Iteração, posição e igualdade continuam as de uma lista comum. Se um campo indexado de um item já
+    # inserido for alterado, é preciso chamar reindex().
+    _index_fields: Tuple[str, ...] = ()
+
+    def __init__(self, items: Iterable = ()):
+        super().__init__(items)
+        self.reindex()
+
+    def reindex(self):
+        self._indexes = {field_name: {} for field_name in self._index_fields}
+        for item in self: self._index(item)
+
+    def _index(self, item):
+        for field_name, index in self._indexes.items():
+            key = getattr(item, field_name)
+            if key is not None: index.setdefault(key, []).append(item)
+
+    def _unindex(self, item):
+        for field_name, index in self._indexes.items():
+            key = getattr(item, field_name)
+            bucket = index.get(key)
+            if bucket is None: continue
+            # Por identidade: itens iguais (dataclass) podem coexistir na lista
+            for i, candidate in enumerate(bucket):
+                if candidate is item: del bucket[i]; break
+            if not bucket: del index[key]
+
+    def lookup(self, field_name: str, key) -> List:
+        return list(self._indexes[field_name].get(key, ()))
+
+    def keys(self, field_name: str) -> List:
+        return list(self._indexes[field_name])
+
+    def append(self, item):
+        super().append(item); self._index(item)
+
+    def extend(self, items: Iterable):
+        items = list(items)
+        super().extend(items)
+        for item in items: self._index(item)
+
+    def __iadd__(self, items: Iterable):
+        self.extend(items)
+        return self
+
+    def insert(self, position: int, item):
+        super().insert(position, item); self._index(item)
+
+    def remove(self, item):
+        position = self.index(item)
+        self._unindex(self[position]); super().__delitem__(position)
+
+    def remove_items(self, items: Iterable):
+        # Remoção em lote (por identidade) em uma única passada pela lista
+        doomed = {id(item): item for item in items}
+        if not doomed: return
+        super().__setitem__(slice(None), [item for item in self if id(item) not in doomed])
+        for item in doomed.values(): self._unindex(item)
+
+    def pop(self, position: int = -1):
+        item = super().pop(position)
+        self._unindex(item)
+        return item
+
+    def clear(self):
+        super().clear(); self.reindex()
+
+    def __setitem__(self, position, value):
+        if isinstance(position, slice):
+            super().__setitem__(position, list(value)); self.reindex()
+        else:
+            self._unindex(self[position]); super().__setitem__(position, value); self._index(value)
+
+    def __delitem__(self, position):
+        removed = self[position] if isinstance(position, slice) else [self[position]]
+        super().__delitem__(position)
+        for item in removed: self._unindex(item)
+
+    def __imul__(self, count: int):
+        super().__imul__(count); self.reindex()
+        return self
+
+    def sort(self, *args, **kwargs):
+        # Reordena também os baldes, para que as consultas sigam a ordem da lista
+        super().sort(*args, **kwargs); self.reindex()
+
+    def reverse(self):
+        super().reverse(); self.reindex()
+
+    def copy(self):
+        return self.__class__(self)
+
+    def __reduce__(self):
+        # Os índices são reconstruídos no unpickle/deepcopy em vez de serializados
+        return (self.__class__, (list(self),))
+
+class RelationshipList(IndexedList):
+    _index_fields = ("name", "source_entity", "target_entity")
+
+class KeyConstraintList(IndexedList):
+    _index_fields = ("entity_name", "constraint_name")
+
 @dataclass
 class IntermediateSchema:
     name: str = "UnnamedSchema"
     entities: Dict[str, Entity] = field(default_factory=dict)
-    relationships: List[Relationship] = field(default_factory=list)
-    key_constraints: List[KeyConstraint] = field(default_factory=list)
\ No newline at end of file
+    relationships: List[Relationship] = field(default_factory=RelationshipList)
+    key_constraints: List[KeyConstraint] = field(default_factory=KeyConstraintList)
+
+    def __setattr__(self, name, value):
+        # Listas comuns atribuídas (inclusive pelo __init__) viram as versões indexadas
+        if name == "relationships" and not isinstance(value, RelationshipList): value = RelationshipList(value)
+        elif name == "key_constraints" and not isinstance(value, KeyConstraintList): value = KeyConstraintList(value)
+        object.__setattr__(self, name, value)
+
+    def relationships_from(self, entity_name: str) -> List[Relationship]:
+        return self.relationships.lookup("source_entity", entity_name)
+
+    def relationships_to(self, entity_name: str) -> List[Relationship]:
+        return self.relationships.lookup("target_entity", entity_name)
+
+    def relationships_of(self, entity_name: str) -> List[Relationship]:
+        # Relações que saem ou chegam na entidade; autorrelações aparecem uma única vez
+        outgoing = self.relationships_from(entity_name)
+        seen = {id(rel) for rel in outgoing}
+        return outgoing + [rel for rel in self.relationships_to(entity_name) if id(rel) not in seen]
+
+    def relationship(self, name: str) -> Optional[Relationship]:
+        found = self.relationships.lookup("name", name)
+        return found[0] if found else None
+
+    def keys_of(self, entity_name: str) -> List[KeyConstraint]:
+        return self.key_constraints.lookup("entity_name", entity_name)
+
+    def key_constraint(self, constraint_name: str) -> Optional[KeyConstraint]:
+        found = self.key_constraints.lookup("constraint_name", constraint_name)
+        return found[0] if found else None
+
+    def remove_entity(self, entity_name: str) -> Optional[Entity]:
+        # Remove a entidade junto com as relações que a tocam e as suas chaves
+        entity = self.entities.pop(entity_name, None)
+        self.relationships.remove_items(self.relationships_of(entity_name))
+        self.key_constraints.remove_items(self.keys_of(entity_name))
+        return entity
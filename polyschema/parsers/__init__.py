@@ -1,5 +1,23 @@
-from .base_parser import SchemaParser
-from .gpfuse_parser import GPFuseParser
-from .jfuse_parser import JFuseParser
-from .redis_parser import RedisParser
-from .relational_parser import RelationalParser
\ No newline at end of file
+import importlib
+from .base_parser import SchemaParser, SchemaSyntaxError
+
+# Os parsers concretos só são importados no primeiro acesso (PEP 562): `import parsers` não carrega
+# json, regex e demais dependências de dialetos que a execução nem usa
+_LAZY_PARSERS = {
+    "GPFuseParser": ".gpfuse_parser",
+    "JFuseParser": ".jfuse_parser",
+    "RedisParser": ".redis_parser",
+    "RelationalParser": ".relational_parser",
+}
+
+__all__ = ["SchemaParser", "SchemaSyntaxError", *_LAZY_PARSERS]
+
+def __getattr__(name: str):
+    module_name = _LAZY_PARSERS.get(name)
+    if module_name is None: raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
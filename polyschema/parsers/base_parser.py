@@ -1,7 +1,15 @@
 from abc import ABC, abstractmethod
 from models import IntermediateSchema
 
+class SchemaSyntaxError(ValueError):
+    def __init__(self, message: str, line: int, column: int):
+        super().__init__(f"{message} (linha {line}, coluna {column})")
+        self.line, self.column = line, column
+
 class SchemaParser(ABC):
+    # Incrementar quando a saída do parser mudar, para invalidar entradas do SchemaCache
+    version: str = "1"
+
     @abstractmethod
     def parse(self, schema_text: str) -> IntermediateSchema:
         pass
\ No newline at end of file
@@ -1,91 +1,258 @@
 import re
-from typing import Optional, List
+from typing import List, Optional, Tuple
 from models import Entity, Property, Relationship, KeyConstraint, IntermediateSchema
-from .base_parser import SchemaParser
+from .base_parser import SchemaParser, SchemaSyntaxError
+
+# Tokens são as próprias strings: palavras (\w+), strings entre aspas (duplas ou simples), '->' ou qualquer
+# outro caractere isolado, que segue para o texto do tipo (ex.: 'FLOAT?'). Comentários (// e /* */) são
+# reconhecidos pelo lexer e descartados.
+_TOKEN_PATTERN = re.compile(r'//[^\n]*|/\*.*?\*/|\w+|"[^"]*"|\'[^\']*\'|->|\S', re.DOTALL)
+_EOF = ""
+
+def _is_word(token: str) -> bool:
+    return token != _EOF and (token[0] == '_' or token[0].isalnum())
+
+class _TokenStream:
+    # Lexer de passada única + cursor usado pelo parser descendente recursivo
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = tokens = _TOKEN_PATTERN.findall(text)
+        if '//' in text or '/*' in text:
+            self.tokens = tokens = [t for t in tokens if not t.startswith(('//', '/*'))]
+        tokens.append(_EOF)
+        self.pos = 0
+        self._starts: Optional[List[int]] = None
+
+    @property
+    def starts(self) -> List[int]:
+        # Posição de cada token no texto, calculada só quando necessária (erros e tipos com vários tokens)
+        if self._starts is None:
+            self._starts = [m.start() for m in _TOKEN_PATTERN.finditer(self.text) if not m.group().startswith(('//', '/*'))]
+            self._starts.append(len(self.text))
+        return self._starts
+
+    def peek(self, offset: int = 0) -> str:
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else _EOF
+
+    def at_word(self, offset: int = 0) -> bool:
+        return _is_word(self.peek(offset))
+
+    def next(self) -> str:
+        token = self.tokens[self.pos]
+        if token != _EOF: self.pos += 1
+        return token
+
+    def accept(self, token: str) -> bool:
+        if self.tokens[self.pos] == token:
+            self.pos += 1
+            return True
+        return False
+
+    def expect(self, token: str):
+        if not self.accept(token): self.error(f"'{token}' esperado")
+
+    def expect_word(self) -> str:
+        token = self.tokens[self.pos]
+        if not _is_word(token): self.error("Identificador esperado")
+        self.pos += 1
+        return token
+
+    def source(self, start: int, end: int) -> str:
+        # Texto original dos tokens [start, end)
+        return self.text[self.starts[start]:self.starts[end - 1] + len(self.tokens[end - 1])]
+
+    def skip_element(self, start: int):
+        # Recuperação após erro: avança até o próximo elemento de nível zero (',' seguido de '(' ou FOR)
+        tokens = self.tokens
+        pos = max(start + 1, self.pos)
+        while tokens[pos] != _EOF and not (tokens[pos - 1] == ',' and tokens[pos] in ('(', 'FOR')): pos += 1
+        self.pos = pos
+
+    def error(self, message: str):
+        token = self.tokens[self.pos]
+        offset = self.starts[self.pos]
+        line = self.text.count('\n', 0, offset) + 1
+        column = offset - (self.text.rfind('\n', 0, offset) + 1) + 1
+        found = token if token != _EOF else "fim do texto"
+        raise SchemaSyntaxError(f"{message}, encontrado '{found}'", line, column)
 
 class GPFuseParser(SchemaParser):
+    # 3: strings com aspas simples e caracteres desconhecidos no tipo são aceitos; blocos malformados são
+    # ignorados com aviso (linha/coluna), como no parser por expressões regulares
+    version = "3"
+
+    # Gramática reconhecida (CREATE GRAPH TYPE):
+    #   schema       := CREATE GRAPH TYPE nome [opções] '{' elemento (',' elemento)* [','] '}'
+    #   elemento     := entidade | relação | chave
+    #   entidade     := '(' tipo ':' rótulo ['&' rótulo] '{' propriedades '}' ')'
+    #   relação      := '(' ':' tipo ')' '-' '[' [tipo ':' nome] ['(' card ')' ';' '(' card ')'] ['(' propriedades ')'] ']' '->' '(' ':' tipo ')'
+    #   chave        := FOR '(' var ':' tipo ')' EXCLUSIVE MANDATORY SINGLETON var '.' (prop | '(' prop (',' prop)* ')')
+    #   propriedade  := [OPTIONAL] nome tipo
     def parse(self, schema_text: str) -> IntermediateSchema:
-        schema_name_match = re.search(r"CREATE GRAPH TYPE (\w+)", schema_text)
-        schema_name = schema_name_match.group(1) if schema_name_match else "UnnamedSchema"
+        stream = _TokenStream(schema_text)
+        schema_name = "UnnamedSchema"
+        while stream.peek() not in ('{', _EOF):
+            if stream.peek() == "CREATE" and stream.peek(1) == "GRAPH" and stream.peek(2) == "TYPE" and stream.at_word(3):
+                schema_name = stream.peek(3); stream.pos += 4
+            else: stream.next()
         schema = IntermediateSchema(name=schema_name)
-        content_match = re.search(r"\{(.*)\}", schema_text, re.DOTALL)
-        if not content_match: return schema
-        content = content_match.group(1)
-        entity_pattern = re.compile(r"\(([\w\s&:]+?\{.*?\})\)", re.DOTALL)
-        for match in entity_pattern.finditer(content):
-            entity = self._parse_entity(match.group(1))
-            if entity: schema.entities[entity.name] = entity
+        if not stream.accept('{'): return schema
+        raw_relationships, raw_keys = [], []
+        while not stream.accept('}') and stream.peek() != _EOF:
+            if stream.accept(','): continue
+            start = stream.pos
+            try:
+                token = stream.peek()
+                if token == "FOR": raw_keys.append(self._parse_key_constraint(stream))
+                elif token == '(' and stream.peek(1) == ':': raw_relationships.append(self._parse_relationship(stream))
+                elif token == '(':
+                    entity = self._parse_entity(stream)
+                    schema.entities[entity.name] = entity
+                else: stream.error("Entidade, relação ou restrição esperada")
+            except SchemaSyntaxError as e:
+                # Um bloco malformado não derruba o arquivo: é ignorado e o parse segue no próximo elemento
+                print(f"\nAVISO: Bloco malformado ignorado: {e}\n")
+                stream.skip_element(start)
+        # Relações e chaves referenciam o tipo (ou o rótulo) da entidade, que pode ser declarada depois delas
         type_to_entity_name = {e.original_type_name: e.name for e in schema.entities.values()}
         name_resolver = {**type_to_entity_name, **{v: v for v in type_to_entity_name.values()}}
-        rel_pattern = re.compile(r"\(:(\w+)\)\s*-\s*\[(.*?)]\s*->\s*\(:(\w+)\)")
-        for match in rel_pattern.finditer(content):
-            source_type, rel_content, target_type = match.groups()
-            source_entity = name_resolver.get(source_type); target_entity = name_resolver.get(target_type)
+        for rel in raw_relationships:
+            source_entity = name_resolver.get(rel.source_entity); target_entity = name_resolver.get(rel.target_entity)
             if source_entity and target_entity:
-                rel = self._parse_relationship(rel_content, source_entity, target_entity)
+                rel.source_entity, rel.target_entity = source_entity, target_entity
                 schema.relationships.append(rel)
-        key_pattern = re.compile(r"FOR\s+\(x:\s*(\w+)\)\s+EXCLUSIVE\s+MANDATORY\s+SINGLETON\s+x\.(\w+|\([^)]+\))")
-        for match in key_pattern.finditer(content):
-            entity_type, prop_names_str = match.groups()
+        for entity_type, properties_list in raw_keys:
             entity_name = name_resolver.get(entity_type)
             if entity_name:
-                cleaned_props = prop_names_str.strip().strip('()')
-                properties_list = [p.strip() for p in cleaned_props.split(',') if p.strip()]
                 key = KeyConstraint(entity_name=entity_name, properties=properties_list, constraint_name=f"{entity_name}Key")
                 schema.key_constraints.append(key)
         return schema
-    def _parse_entity(self, entity_text: str) -> Optional[Entity]:
-        header_match = re.match(r"(\w+)\s*:\s*([\w\s&]+?)\s*\{(.*)\}", entity_text, re.DOTALL)
-        if not header_match:
-            print(f"\nAVISO: Bloco de entidade malformado ignorado:\n{entity_text}\n")
-            return None
-        original_type, name_part, props_part = header_match.groups()
+    def _parse_entity(self, stream: _TokenStream) -> Entity:
+        stream.expect('(')
+        original_type = stream.expect_word()
+        stream.expect(':')
+        name = stream.expect_word()
         extends = None
-        if "&" in name_part:
-            super_label, sub_label = [n.strip() for n in name_part.split("&")]
-            name = sub_label; extends = super_label
-        else: name = name_part.strip()
-        properties = self._parse_properties(props_part)
+        if stream.accept('&'):
+            extends, name = name, stream.expect_word()
+        stream.expect('{')
+        properties = self._parse_properties(stream, '}')
+        stream.expect(')')
         return Entity(name=name, entity_type="GRAPH", properties=properties, extends=extends, original_type_name=original_type)
-    def _parse_properties(self, props_text: str) -> List[Property]:
+    def _parse_properties(self, stream: _TokenStream, closing: str) -> List[Property]:
+        # Consome propriedades separadas por vírgula até o delimitador de fechamento (inclusive)
+        properties = []
+        tokens = stream.tokens
+        while True:
+            token = tokens[stream.pos]
+            if token == closing: stream.pos += 1; return properties
+            if token == ',': stream.pos += 1; continue
+            if token == _EOF: stream.error(f"'{closing}' esperado")
+            properties.append(self._parse_property(stream, closing))
+    def _parse_property(self, stream: _TokenStream, closing: str) -> Property:
+        is_optional = stream.accept("OPTIONAL")
+        prop_name = stream.expect_word()
+        # O tipo é a sequência de tokens até a próxima vírgula de nível zero (ou o fechamento do bloco); um
+        # parêntese não fechado no tipo não atravessa o '}' da entidade
+        tokens, start, depth = stream.tokens, stream.pos, 0
+        pos = start
+        while True:
+            token = tokens[pos]
+            if token == _EOF or (depth == 0 and (token == ',' or token == closing)) or (token == '}' and closing == '}'): break
+            if token == '"':
+                stream.pos = pos; stream.error("String não terminada")
+            if token == '(': depth += 1
+            elif token == ')': depth -= 1
+            pos += 1
+        type_tokens = tokens[start:pos]
+        if not type_tokens: stream.error(f"Tipo esperado para a propriedade '{prop_name}'")
+        end, stream.pos = pos, pos
+        if "OPTIONAL" in type_tokens:
+            is_optional = True
+            type_tokens = [t for t in type_tokens if t != "OPTIONAL"]
+            if not type_tokens: stream.error(f"Tipo esperado para a propriedade '{prop_name}'")
+        constraints = ["OPTIONAL" if is_optional else "REQUIRED"]
+        final_type, details = "", {}
+        upper_type = type_tokens[0].upper() if len(type_tokens) == 1 else " ".join(type_tokens).upper()
+        if "ENUM" in upper_type:
+            final_type = "ENUM"
+            details['values'] = [t[1:-1] for t in type_tokens if t[0] == '"']
+        elif "ARRAY" in upper_type:
+            final_type = "ARRAY"
+            inner_type, size = None, None
+            for i, token in enumerate(type_tokens):
+                following = type_tokens[i + 1:i + 5]
+                if inner_type is None and token.upper() == "ARRAY" and following and _is_word(following[0]):
+                    inner_type = following[0]
+                if (size is None and token == '(' and len(following) == 4 and following[0].isdigit() and following[1] in (',', ':')
+                        and following[2].isdigit() and following[3] == ')'):
+                    size = (following[0], following[2])
+            details['inner_type'] = self._map_type(inner_type) if inner_type else "STRING"
+            details['min'] = size[0] if size else "0"
+            details['max'] = size[1] if size else "N"
+        elif len(type_tokens) == 1: final_type = self._map_type(type_tokens[0])
+        else:
+            # Tipo com vários tokens (ex.: 'FLOAT?', 'VARCHAR (10)'): segue o texto original
+            final_type = self._map_type(stream.source(start, end).replace("OPTIONAL", ""))
+        return Property(name=prop_name, type=final_type, constraints=constraints, details=details)
+    def _parse_relationship(self, stream: _TokenStream) -> Relationship:
+        source_type = self._parse_type_ref(stream)
+        stream.expect('-'); stream.expect('[')
+        rel_name = "RELATED_TO"
+        if stream.at_word() and stream.peek(1) == ':' and stream.at_word(2):
+            rel_name = stream.peek(2); stream.pos += 3
+        bwd, fwd = "0:N", "0:N"
         properties = []
-        prop_lines = [p.strip() for p in re.split(r",\s*(?![^()]*\))", props_text) if p.strip()]
-        for line in prop_lines:
-            is_optional = "OPTIONAL" in line
-            cleaned_line = line.replace("OPTIONAL", "").strip()
-            constraints = ["OPTIONAL" if is_optional else "REQUIRED"]
-            prop_match = re.match(r"(\w+)\s+(.*)", cleaned_line, re.IGNORECASE)
-            if not prop_match: continue
-            prop_name, prop_type_str = prop_match.groups()
-            final_type, details = "", {}
-            if "ENUM" in prop_type_str.upper():
-                final_type = "ENUM"
-                details['values'] = re.findall(r'"(.*?)"', prop_type_str)
-            elif "ARRAY" in prop_type_str.upper():
-                final_type = "ARRAY"
-                type_match = re.search(r"ARRAY\s+(\w+)", prop_type_str, re.IGNORECASE)
-                size_match = re.search(r"\((\d+)[,:](\d+)\)", prop_type_str)
-                details['inner_type'] = self._map_type(type_match.group(1)) if type_match else "STRING"
-                details['min'] = size_match.group(1) if size_match else "0"
-                details['max'] = size_match.group(2) if size_match else "N"
-            else: final_type = self._map_type(prop_type_str)
-            prop = Property(name=prop_name, type=final_type, constraints=constraints, details=details)
-            properties.append(prop)
-        return properties
-    def _parse_relationship(self, rel_text: str, source: str, target: str) -> Relationship:
-        temp_rel_text = rel_text
-        card_match = re.search(r"\(([\d\w:]+)\)\s*;\s*\(([\d\w:]+)\)", temp_rel_text)
-        bwd, fwd = card_match.groups() if card_match else ("0:N", "0:N")
-        if card_match:
-            temp_rel_text = temp_rel_text.replace(card_match.group(0), "").strip()
-        props_part_match = re.search(r"\((.*)\)", temp_rel_text)
-        props_str = props_part_match.group(1) if props_part_match else ""
-        name_match = re.match(r"\w+\s*:\s*(\w+)", temp_rel_text)
-        rel_name = name_match.group(1) if name_match else "RELATED_TO"
-        properties = self._parse_properties(props_str) if props_str else []
-        return Relationship(name=rel_name, source_entity=source, target_entity=target,cardinality_fwd=fwd.strip(), cardinality_bwd=bwd.strip(),properties=properties)
+        while not stream.accept(']'):
+            if stream.peek() != '(': stream.error("'(' ou ']' esperado")
+            cardinalities = self._match_cardinalities(stream)
+            if cardinalities: bwd, fwd = cardinalities
+            else:
+                stream.next()
+                properties.extend(self._parse_properties(stream, ')'))
+        stream.expect('->')
+        target_type = self._parse_type_ref(stream)
+        # Origem/destino guardam o nome do tipo até a resolução feita em parse()
+        return Relationship(name=rel_name, source_entity=source_type, target_entity=target_type, cardinality_fwd=fwd, cardinality_bwd=bwd, properties=properties)
+    def _match_cardinalities(self, stream: _TokenStream) -> Optional[Tuple[str, str]]:
+        # Reconhece '(' card ')' ';' '(' card ')' com card = palavras separadas por ':' (ex.: 1:1, 0:N)
+        start = stream.pos
+        first = self._match_cardinality(stream)
+        if first is not None and stream.accept(';'):
+            second = self._match_cardinality(stream)
+            if second is not None: return first, second
+            stream.error("Cardinalidade esperada")
+        stream.pos = start
+        return None
+    def _match_cardinality(self, stream: _TokenStream) -> Optional[str]:
+        start = stream.pos
+        if stream.accept('(') and stream.at_word():
+            parts = [stream.next()]
+            while stream.peek() == ':' or stream.at_word(): parts.append(stream.next())
+            if stream.accept(')'): return "".join(parts)
+        stream.pos = start
+        return None
+    def _parse_type_ref(self, stream: _TokenStream) -> str:
+        stream.expect('('); stream.expect(':')
+        type_name = stream.expect_word()
+        stream.expect(')')
+        return type_name
+    def _parse_key_constraint(self, stream: _TokenStream) -> Tuple[str, List[str]]:
+        stream.expect("FOR"); stream.expect('(')
+        variable = stream.expect_word()
+        stream.expect(':')
+        entity_type = stream.expect_word()
+        stream.expect(')')
+        for keyword in ("EXCLUSIVE", "MANDATORY", "SINGLETON"): stream.expect(keyword)
+        stream.expect(variable); stream.expect('.')
+        if not stream.accept('('): return entity_type, [stream.expect_word()]
+        properties_list = [stream.expect_word()]
+        while stream.accept(','): properties_list.append(stream.expect_word())
+        stream.expect(')')
+        return entity_type, properties_list
     def _map_type(self, gpfuse_type: str) -> str:
         gpfuse_type = gpfuse_type.upper().strip()
         if gpfuse_type in ["INT", "FLOAT"]: return "NUMBER"
         if gpfuse_type == "STR": return "STRING"
-        return gpfuse_type
\ No newline at end of file
+        return gpfuse_type
@@ -1,24 +1,37 @@
 import re
-from typing import Optional, List
-from models import Entity, Property, Relationship, KeyConstraint, IntermediateSchema
+from typing import Dict, List, Optional, Tuple
+from models import Entity, Property, KeyConstraint, IntermediateSchema
 from .base_parser import SchemaParser
-from typing import Dict, Optional
+
+_RULE_PATTERN = re.compile(r"(\w+)\s*::=\s*(.*)")
+_CONTINUATION_PATTERN = re.compile(r",\s*\n\s*")
+_PROP_SPLIT_PATTERN = re.compile(r",\s*(?![^[]*\])")
+_TYPE_MAP = {'R': 'NUMBER', 'TS': 'DATE', 'S': 'STRING', 'null': 'NULL'}
+
+# Resultado memoizado da expansão de uma regra: propriedades-modelo e nomes das propriedades-chave
+RuleExpansion = Tuple[List[Property], List[str]]
 
 class JFuseParser(SchemaParser):
+    # 2: expansões de regras recursivas não dependem mais da ordem das entidades em 'root'
+    # 3: cada regra é expandida uma vez por parse; ciclos viram 'ref' dentro do componente recursivo
+    version = "3"
+
     def parse(self, schema_text: str) -> IntermediateSchema:
         schema = IntermediateSchema(name="JFuseSchema")
         parsed_rules = {}
-        rule_pattern = re.compile(r"(\w+)\s*::=\s*(.*)")
-        full_text = re.sub(r",\s*\n\s*", ", ", schema_text)
+        full_text = _CONTINUATION_PATTERN.sub(", ", schema_text)
         for line in full_text.split('\n'):
             line = line.strip()
             if not line: continue
-            match = rule_pattern.match(line)
+            match = _RULE_PATTERN.match(line)
             if match:
                 lhs, rhs = match.groups()
                 parsed_rules[lhs.strip()] = rhs.strip()
         if 'root' not in parsed_rules:
             raise ValueError("Regra 'root' não encontrada no schema JFUSE.")
+        # Cache por parse: cada regra é expandida uma única vez, mesmo se referenciada por várias entidades
+        expansions: Dict[str, RuleExpansion] = {}
+        components = self._rule_components(parsed_rules)
         root_rhs = parsed_rules['root'].strip('{}')
         for field in root_rhs.split(','):
             if ':' not in field: continue
@@ -26,7 +39,7 @@ class JFuseParser(SchemaParser):
             obj_rule_name = self._resolve_object_rule(rule_ref, parsed_rules)
             if obj_rule_name and obj_rule_name in parsed_rules:
                 entity = Entity(name=entity_name, entity_type="DOCUMENT")
-                properties, key_constraints = self._build_properties_from_rule(obj_rule_name, parsed_rules)
+                properties, key_constraints = self._build_properties_from_rule(obj_rule_name, parsed_rules, expansions, components)
                 entity.properties = properties
                 schema.entities[entity.name] = entity
                 for kc in key_constraints:
@@ -40,22 +53,59 @@ class JFuseParser(SchemaParser):
         rhs = parsed_rules[rule_name]
         return rhs.strip('[]') if rhs.startswith('[') and rhs.endswith(']') else rule_name
 
-    def _build_properties_from_rule(self, rule_name: str, parsed_rules: Dict) -> (List[Property], List[KeyConstraint]):
-        properties, key_constraints = [], []
+    def _build_properties_from_rule(self, rule_name: str, parsed_rules: Dict, expansions: Optional[Dict[str, RuleExpansion]] = None, components: Optional[Dict[str, int]] = None) -> Tuple[List[Property], List[KeyConstraint]]:
         if rule_name not in parsed_rules: return [], []
-        rule_body = parsed_rules[rule_name]
-        prop_definitions = re.split(r",\s*(?![^[]*\])", rule_body)
-        for prop_def in prop_definitions:
+        if expansions is None: expansions = {}
+        if components is None: components = self._rule_components(parsed_rules)
+        properties, key_names = self._expand_rule(rule_name, parsed_rules, expansions, components)
+        # O modelo memoizado é compartilhado entre referências: cada uso recebe sua própria cópia
+        return self._clone_properties(properties), [KeyConstraint(entity_name="", properties=[name]) for name in key_names]
+
+    def _rule_fields(self, rhs: str):
+        for prop_def in _PROP_SPLIT_PATTERN.split(rhs):
             prop_def = prop_def.strip()
             if ':' not in prop_def: continue
             prop_name, type_str = [x.strip() for x in prop_def.split(':', 1)]
             is_key = type_str.endswith('k')
-            if is_key: type_str = type_str[:-1]
+            yield prop_name, type_str[:-1] if is_key else type_str, is_key
+
+    def _rule_refs(self, rule_name: str, parsed_rules: Dict) -> List[str]:
+        refs = (self._resolve_object_rule(t, parsed_rules) for _, t, _ in self._rule_fields(parsed_rules[rule_name]) if t.startswith('arr_'))
+        return [ref for ref in refs if ref in parsed_rules]
+
+    def _rule_components(self, parsed_rules: Dict) -> Dict[str, int]:
+        # Tarjan iterativo: regras mutuamente recursivas caem no mesmo componente fortemente conexo
+        index, low, component, stack, on_stack = {}, {}, {}, [], set()
+        def visit(rule):
+            index[rule] = low[rule] = len(index); stack.append(rule); on_stack.add(rule)
+            return rule, iter(self._rule_refs(rule, parsed_rules))
+        for start in parsed_rules:
+            if start in index: continue
+            work = [visit(start)]
+            while work:
+                rule, refs = work[-1]
+                for ref in refs:
+                    if ref not in index: work.append(visit(ref)); break
+                    if ref in on_stack: low[rule] = min(low[rule], index[ref])
+                else:
+                    work.pop()
+                    if work: low[work[-1][0]] = min(low[work[-1][0]], low[rule])
+                    if low[rule] == index[rule]:
+                        while True:
+                            member = stack.pop(); on_stack.discard(member); component[member] = index[rule]
+                            if member == rule: break
+        return component
+
+    def _expand_rule(self, rule_name: str, parsed_rules: Dict, expansions: Dict[str, RuleExpansion], components: Dict[str, int]) -> RuleExpansion:
+        # Referências dentro do mesmo componente (ciclos) viram 'ref'; as demais apontam para componentes
+        # já resolvidos. Assim cada regra é expandida uma única vez por parse, independente da ordem em 'root'
+        if rule_name in expansions: return expansions[rule_name]
+        properties, key_names = [], []
+        for prop_name, type_str, is_key in self._rule_fields(parsed_rules[rule_name]):
             prop = Property(name=prop_name, type="STRING")
             if is_key: prop.constraints.append("REQUIRED")
-            type_map = {'R': 'NUMBER', 'TS': 'DATE', 'S': 'STRING', 'null': 'NULL'}
-            if type_str in type_map:
-                prop.type = type_map.get(type_str)
+            if type_str in _TYPE_MAP:
+                prop.type = _TYPE_MAP[type_str]
             elif type_str.startswith('[') and type_str.endswith(']'):
                 prop.type = 'ENUM'
                 values = type_str.strip('[]').replace('...', '').split(',')
@@ -63,15 +113,24 @@ class JFuseParser(SchemaParser):
             elif type_str.startswith('arr_'):
                 prop.type = 'ARRAY'
                 obj_rule_ref = self._resolve_object_rule(type_str, parsed_rules)
-                if obj_rule_ref:
-                    nested_props, nested_keys = self._build_properties_from_rule(obj_rule_ref, parsed_rules)
-                    prop.details['nested_properties'] = nested_props
-                    key_prop_names = {p for key in nested_keys for p in key.properties}
-                    for p_nested in prop.details['nested_properties']:
-                        if p_nested.name in key_prop_names and 'KEY' not in p_nested.constraints:
-                             p_nested.constraints.append('KEY')
+                if obj_rule_ref in parsed_rules and components[obj_rule_ref] == components[rule_name]:
+                    # Gramática recursiva: referencia a regra em vez de expandi-la outra vez
+                    prop.details['ref'] = obj_rule_ref
+                elif obj_rule_ref:
+                    # Propriedades-chave aninhadas já recebem KEY na própria expansão
+                    prop.details['nested_properties'] = self._expand_rule(obj_rule_ref, parsed_rules, expansions, components)[0] if obj_rule_ref in parsed_rules else []
             if is_key and 'KEY' not in prop.constraints:
                 prop.constraints.append("KEY")
-                key_constraints.append(KeyConstraint(entity_name="", properties=[prop_name]))
+                key_names.append(prop_name)
             properties.append(prop)
-        return properties, key_constraints
\ No newline at end of file
+        expansions[rule_name] = (properties, key_names)
+        return properties, key_names
+
+    def _clone_properties(self, properties: List[Property]) -> List[Property]:
+        clones = []
+        for prop in properties:
+            details = dict(prop.details)
+            if 'nested_properties' in details: details['nested_properties'] = self._clone_properties(details['nested_properties'])
+            if 'values' in details: details['values'] = list(details['values'])
+            clones.append(Property(name=prop.name, type=prop.type, constraints=list(prop.constraints), details=details))
+        return clones
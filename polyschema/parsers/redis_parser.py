@@ -1,27 +1,167 @@
-import re
-from typing import Optional, List
-from models import Entity, Property, Relationship, KeyConstraint, IntermediateSchema
-from .base_parser import SchemaParser
+import io
 import json
+from typing import Any, Dict, Iterator, Optional, TextIO
+from models import Entity, Property, IntermediateSchema
+from .base_parser import SchemaParser
+
+_WHITESPACE = " \t\n\r"
+_TYPE_MAP = {"integer": "NUMBER", "number": "NUMBER", "string": "STRING", "boolean": "BOOLEAN", "date-time": "DATE"}
+# Chaves de nível superior guardadas durante a leitura: título do schema e sub-schemas referenciáveis via $ref
+_HEADER_KEYS = ("title", "definitions", "$defs")
+_DEFINITION_KEYS = ("definitions", "$defs")
+
+class _JsonObjectReader:
+    # Leitor incremental de um objeto JSON: decodifica um valor por vez (json.JSONDecoder.raw_decode)
+    # a partir de um buffer alimentado em blocos, sem carregar o documento inteiro
+    def __init__(self, stream: TextIO, chunk_size: int):
+        self._stream, self._chunk_size = stream, chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer, self._pos, self._eof = "", 0, False
+
+    def _fill(self, min_size: int = 1) -> bool:
+        if self._eof: return False
+        if self._pos > len(self._buffer) // 2:
+            self._buffer, self._pos = self._buffer[self._pos:], 0
+        target = len(self._buffer) - self._pos + min_size
+        while len(self._buffer) - self._pos < target:
+            chunk = self._stream.read(max(self._chunk_size, min_size))
+            if not chunk:
+                self._eof = True
+                return False
+            self._buffer += chunk
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE: self._pos += 1
+            if self._pos < len(self._buffer): return self._buffer[self._pos]
+            if not self._fill(): return ""
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"JSON inválido: esperado '{char}', encontrado '{found or 'fim do arquivo'}'.")
+        self._pos += 1
+
+    def decode_value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # Números no fim do buffer podem estar incompletos (ex.: "12" de "123")
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof: raise
+            # Valor incompleto: dobra o trecho disponível e tenta de novo (custo amortizado linear)
+            self._fill(max(self._chunk_size, len(self._buffer) - self._pos))
+
+    def iter_keys(self) -> Iterator[str]:
+        # Itera as chaves do objeto atual; quem consome deve ler (ou percorrer) o valor antes de avançar
+        self.expect('{')
+        if self.peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self.decode_value()
+            if not isinstance(key, str): raise ValueError("JSON inválido: chave de objeto deve ser string.")
+            self.expect(':')
+            yield key
+            if self.peek() == '}':
+                self._pos += 1
+                return
+            self.expect(',')
 
 class RedisParser(SchemaParser):
     def parse(self, schema_text: str) -> IntermediateSchema:
-        data = json.loads(schema_text)
-        schema = IntermediateSchema(name=data.get("title", "RedisSchema"))
-        if "properties" not in data: return schema
-        for entity_name, entity_schema in data["properties"].items():
-            entity = Entity(name=entity_name, entity_type="KEY_VALUE")
-            required_fields = set(entity_schema.get("required", []))
-            if "properties" in entity_schema:
-                for prop_name, prop_schema in entity_schema["properties"].items():
-                    prop_type = self._map_type(prop_schema.get("type"))
-                    constraints = ["REQUIRED"] if prop_name in required_fields else ["OPTIONAL"]
-                    prop = Property(name=prop_name, type=prop_type, constraints=constraints)
-                    entity.properties.append(prop)
-            schema.entities[entity_name] = entity
+        return self.parse_stream(io.StringIO(schema_text))
+
+    def parse_stream(self, stream: TextIO, chunk_size: int = 1 << 16) -> IntermediateSchema:
+        header: Dict[str, Any] = {}
+        entities = list(self.iter_entities(stream, chunk_size, header))
+        schema = IntermediateSchema(name=header.get("title", "RedisSchema"))
+        for entity in entities: schema.entities[entity.name] = entity
         return schema
 
-    def _map_type(self, json_type: str) -> str:
+    def iter_entities(self, stream: TextIO, chunk_size: int = 1 << 16, header: Optional[Dict[str, Any]] = None) -> Iterator[Entity]:
+        # Percorre data["properties"] do stream e gera uma entidade por vez. `header` recebe title/definitions/$defs.
+        # Entidades com $ref para definitions/$defs ainda não lidos (declarados depois de "properties") ficam em
+        # espera, junto com as seguintes para preservar a ordem, até o fim do documento. $ref que nunca vão
+        # resolver (externos, nomes inexistentes) valem {} na hora e não seguram nada.
+        header = {} if header is None else header
+        reader = _JsonObjectReader(stream, chunk_size)
+        resolver = _RefResolver(header)
+        pending = []
+        for key in reader.iter_keys():
+            if key != "properties":
+                value = reader.decode_value()
+                if key in _HEADER_KEYS: header[key] = value
+                continue
+            for entity_name in reader.iter_keys():
+                entity_schema = reader.decode_value()
+                if pending or not resolver.can_resolve(entity_schema):
+                    pending.append((entity_name, entity_schema))
+                    continue
+                yield self._build_entity(entity_name, entity_schema, resolver)
+        for entity_name, entity_schema in pending:
+            yield self._build_entity(entity_name, entity_schema, resolver)
+
+    def _build_entity(self, entity_name: str, entity_schema: Dict, resolver: "_RefResolver") -> Entity:
+        entity_schema = resolver.resolve(entity_schema)
+        entity = Entity(name=entity_name, entity_type="KEY_VALUE")
+        required_fields = set(entity_schema.get("required", []))
+        if "properties" in entity_schema:
+            for prop_name, prop_schema in entity_schema["properties"].items():
+                prop_type = self._map_type(resolver.resolve(prop_schema).get("type"))
+                constraints = ["REQUIRED"] if prop_name in required_fields else ["OPTIONAL"]
+                prop = Property(name=prop_name, type=prop_type, constraints=constraints)
+                entity.properties.append(prop)
+        return entity
+
+    def _map_type(self, json_type) -> str:
+        if isinstance(json_type, list):
+            # Tipos múltiplos (ex.: ["string", "null"]): usa o primeiro que não seja null
+            json_type = next((t for t in json_type if t != "null"), None)
         if not json_type: return "STRING"
-        type_map = {"integer": "NUMBER", "number": "NUMBER", "string": "STRING", "boolean": "BOOLEAN", "date-time": "DATE"}
-        return type_map.get(json_type.lower(), "STRING")
\ No newline at end of file
+        return _TYPE_MAP.get(json_type.lower(), "STRING")
+
+class _RefResolver:
+    # Resolve $ref locais (#/definitions/..., #/$defs/... ou qualquer ponteiro JSON sobre o cabeçalho lido),
+    # guardando cada resolução para que sub-schemas compartilhados sejam resolvidos uma única vez
+    def __init__(self, header: Dict[str, Any]):
+        self._header = header
+        self._cache: Dict[str, Dict] = {}
+
+    def can_resolve(self, schema: Any) -> bool:
+        # False só se algum $ref aponta para uma seção do cabeçalho (definitions/$defs) que ainda não foi lida
+        refs = []
+        if isinstance(schema, dict):
+            if "$ref" in schema: refs.append(schema["$ref"])
+            for prop_schema in (schema.get("properties") or {}).values():
+                if isinstance(prop_schema, dict) and "$ref" in prop_schema: refs.append(prop_schema["$ref"])
+        return not any(self._awaits_header(ref) for ref in refs)
+
+    def _awaits_header(self, ref: Any) -> bool:
+        if not isinstance(ref, str) or not ref.startswith("#/"): return False
+        section = ref[2:].split('/', 1)[0]
+        return section in _DEFINITION_KEYS and section not in self._header
+
+    def resolve(self, schema: Any) -> Dict:
+        if not isinstance(schema, dict): return {}
+        if "$ref" not in schema: return schema
+        ref = schema["$ref"]
+        if ref not in self._cache:
+            # Marca como vazio durante a resolução para interromper cadeias cíclicas de $ref
+            self._cache[ref] = {}
+            self._cache[ref] = self.resolve(self._lookup(ref))
+        return self._cache[ref]
+
+    def _lookup(self, ref: Any) -> Optional[Any]:
+        if not isinstance(ref, str) or not ref.startswith("#/"): return None
+        node: Any = self._header
+        for part in ref[2:].split('/'):
+            part = part.replace("~1", "/").replace("~0", "~")
+            if not isinstance(node, dict) or part not in node: return None
+            node = node[part]
+        return node
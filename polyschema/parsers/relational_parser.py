@@ -1,44 +1,188 @@
+import io
 import re
-from typing import Optional, List
+from typing import Iterator, Optional, List, TextIO, Tuple
 from models import Entity, Property, Relationship, KeyConstraint, IntermediateSchema
 from .base_parser import SchemaParser
 
+_QUALIFIED_NAME = r"((?:[`\"\w]+\.)*[`\"\w]+)"
+_CREATE_TABLE_PATTERN = re.compile(r"CREATE\s+(?:(?:GLOBAL|LOCAL)\s+)?(?:(?:TEMP|TEMPORARY|UNLOGGED)\s+)?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?" + _QUALIFIED_NAME, re.IGNORECASE)
+_ALTER_TABLE_PATTERN = re.compile(r"ALTER\s+TABLE\s+(?:ONLY\s+)?(?:IF\s+EXISTS\s+)?(?:ONLY\s+)?" + _QUALIFIED_NAME, re.IGNORECASE)
+_ADD_CONSTRAINT_PATTERN = re.compile(r"ADD\s+CONSTRAINT\s+([`\"\w]+)\s+(PRIMARY\s+KEY|FOREIGN\s+KEY)\s*\((.*?)\)(?:\s*REFERENCES\s+" + _QUALIFIED_NAME + ")?", re.IGNORECASE | re.DOTALL)
+_FOREIGN_KEY_PATTERN = re.compile(r"CONSTRAINT\s+([`\"\w]+)\s+FOREIGN KEY\s*\((.*?)\)\s+REFERENCES\s+" + _QUALIFIED_NAME, re.IGNORECASE)
+_TABLE_BODY_PATTERN = re.compile(r"\((.*)\)", re.DOTALL)
+_PRIMARY_KEY_PATTERN = re.compile(r"PRIMARY KEY\s*\((.*?)\)", re.IGNORECASE)
+_CONSTRAINT_NAME_PATTERN = re.compile(r"CONSTRAINT\s+([`\"\w]+)", re.IGNORECASE)
+_DEFINITION_SEPARATOR = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`|[(),]", re.DOTALL)
+_TABLE_CONSTRAINT_PATTERN = re.compile(r"(?:CONSTRAINT|PRIMARY\s+KEY|FOREIGN\s+KEY|UNIQUE|CHECK|EXCLUDE)\b", re.IGNORECASE)
+# Primeiro caractere dos tokens relevantes para a divisão em statements; '-', '/' e '$' são confirmados em
+# Python ('--', '/*', '$tag$'). Parênteses são contados em bloco com str.count no trecho entre dois tokens.
+_SQL_SPECIAL = re.compile(r"[;'\"`$/-]")
+_DOLLAR_TAG = re.compile(r"\$(?:[A-Za-z_]\w*)?\$")
+_DOLLAR_TAG_PREFIX = re.compile(r"\$\w*\Z")
+# Fronteira de statement de um dump (';' no fim da linha e palavra-chave no início da seguinte): encerra um
+# statement mesmo com aspas, comentário de bloco ou parêntese pendente, para que um erro não engula o resto
+# do arquivo. Blocos $tag$ não passam por ela, pois corpos de função contêm statements legítimos.
+_BOUNDARY = r";\r?\n(?=(?:CREATE|ALTER|DROP|INSERT|COMMENT|SET|GRANT|REVOKE|LOCK|UNLOCK|COPY|SELECT|USE)\b)"
+_STATEMENT_BOUNDARY = re.compile(_BOUNDARY)
+_BOUNDARY_LOOKAHEAD = 16
+# Busca do terminador pendente; em strings com aspas simples ou duplas, '\' escapa o caractere seguinte
+# (E'...' do PostgreSQL e strings do MySQL)
+_CLOSING_SCAN = {
+    "'": re.compile(r"[\\']|" + _BOUNDARY),
+    '"': re.compile(r'[\\"]|' + _BOUNDARY),
+    '`': re.compile(r"`|" + _BOUNDARY),
+    "*/": re.compile(r"\*/|" + _BOUNDARY),
+}
+
+def _unquote_name(raw_name: str) -> str:
+    # Remove aspas e o qualificador de schema (public.patients -> patients)
+    return raw_name.split('.')[-1].strip('`"')
+
+def _iter_statements(stream: TextIO, chunk_size: int) -> Iterator[str]:
+    # Divide o DDL em statements lendo `stream` em blocos. Ponto e vírgula só encerra o statement fora de
+    # strings/identificadores entre aspas, comentários, blocos $tag$ e parênteses, exceto numa fronteira de
+    # dump (_BOUNDARY), que descarta o estado pendente. Comentários são trocados por um espaço. A memória fica
+    # limitada ao maior statement (mais um bloco de leitura).
+    buffer, pieces = "", []
+    pos = seg_start = depth = 0
+    closing = None          # terminador pendente: aspas, '\n', '*/' ou a tag $...$
+    in_comment = False
+    eof = False
+    while True:
+        need_more = False
+        if closing is not None:
+            scan = _CLOSING_SCAN.get(closing)
+            boundary = False
+            if scan is None:
+                end = buffer.find(closing, pos)
+                resume = max(pos, len(buffer) - len(closing) + 1)
+            else:
+                end, resume = -1, pos
+                match = scan.search(buffer, pos)
+                while match is not None and match.group() == '\\':
+                    # Barra no fim do buffer: o caractere escapado ainda não foi lido
+                    if match.end() == len(buffer) and not eof: break
+                    resume = match.end() + 1
+                    match = scan.search(buffer, resume)
+                if match is None: resume = max(resume, len(buffer) - _BOUNDARY_LOOKAHEAD)
+                elif match.group() == '\\': resume = match.start()
+                else: end, boundary = match.start(), match.group()[0] == ';'
+            if end == -1 and not eof:
+                need_more = True
+                pos = resume
+            elif boundary:
+                if not in_comment: pieces.append(buffer[seg_start:end])
+                statement = "".join(pieces).strip()
+                if statement: yield statement
+                pieces, seg_start = [], end + 1
+                pos, closing, in_comment, depth = end + 1, None, False, 0
+            else:
+                end = len(buffer) if end == -1 else end
+                if in_comment:
+                    seg_start = pos = end if closing == '\n' else end + len(closing)
+                    in_comment = False
+                else:
+                    pos = end + len(closing)
+                closing = None
+        else:
+            match = _SQL_SPECIAL.search(buffer, pos)
+            start = match.start() if match else len(buffer)
+            depth = max(0, depth + buffer.count('(', pos, start) - buffer.count(')', pos, start))
+            if match is None:
+                pos = len(buffer)
+                need_more = True
+            else:
+                token = match.group()
+                pos = match.end()
+                if token == ';':
+                    if depth and not eof and len(buffer) - start < _BOUNDARY_LOOKAHEAD:
+                        # Parêntese pendente: confere a fronteira de dump quando houver texto suficiente
+                        pos = start
+                        need_more = True
+                    else:
+                        if depth and _STATEMENT_BOUNDARY.match(buffer, start): depth = 0
+                        if depth == 0:
+                            pieces.append(buffer[seg_start:start])
+                            statement = "".join(pieces).strip()
+                            if statement: yield statement
+                            pieces, seg_start = [], pos
+                elif token in ("'", '"', '`'): closing = token
+                elif token in ('-', '/'):
+                    following = buffer[pos:pos + 1]
+                    if following == ('-' if token == '-' else '*'):
+                        pieces.append(buffer[seg_start:start]); pieces.append(' ')
+                        closing, in_comment = ('\n' if token == '-' else "*/"), True
+                        pos += 1
+                    elif not following and not eof:
+                        # Possível início de comentário cortado no fim do buffer: relê com mais dados
+                        pos = start
+                        need_more = True
+                elif start == 0 or not (buffer[start - 1].isalnum() or buffer[start - 1] == '_'):
+                    tag_match = _DOLLAR_TAG.match(buffer, start)
+                    if tag_match:
+                        closing, pos = tag_match.group(), tag_match.end()
+                    elif not eof and _DOLLAR_TAG_PREFIX.match(buffer, start):
+                        pos = start
+                        need_more = True
+        if need_more:
+            if eof:
+                pieces.append(buffer[seg_start:])
+                statement = "".join(pieces).strip()
+                if statement: yield statement
+                return
+            # Compacta o buffer: o trecho já varrido vai para `pieces` (ou é descartado, se for comentário)
+            if not in_comment: pieces.append(buffer[seg_start:pos])
+            chunk = stream.read(chunk_size)
+            if not chunk: eof = True
+            buffer = buffer[pos:] + chunk
+            pos = seg_start = 0
+
 class RelationalParser(SchemaParser):
+    # 2: UNIQUE/CHECK de tabela não viram colunas, nomes perdem o schema e ALTER TABLE ... ADD CONSTRAINT é aplicado
+    # 3: escapes com barra invertida em strings e ressincronização em fronteiras de statement
+    version = "3"
+
     def parse(self, schema_text: str) -> IntermediateSchema:
+        return self.parse_stream(io.StringIO(schema_text))
+    def parse_stream(self, stream: TextIO, chunk_size: int = 1 << 16) -> IntermediateSchema:
+        # Passada única por statement: CREATE TABLE gera entidade, chave e relações; ALTER TABLE ... ADD CONSTRAINT
+        # (formato do pg_dump) complementa chaves e relações. Demais statements (INSERT, COMMENT, INDEX...) são ignorados.
         schema = IntermediateSchema(name="RelationalSchema")
-        create_table_blocks = re.findall(r"CREATE TABLE.*?;", schema_text, re.DOTALL | re.IGNORECASE)
-        for block in create_table_blocks:
-            entity, key_constraint = self._parse_entity_and_pk(block)
-            if entity: schema.entities[entity.name] = entity
-            if key_constraint: schema.key_constraints.append(key_constraint)
-        for block in create_table_blocks:
-            relationships = self._parse_relationships(block)
-            schema.relationships.extend(relationships)
+        for statement in _iter_statements(stream, chunk_size):
+            create_match = _CREATE_TABLE_PATTERN.match(statement)
+            if create_match:
+                entity, key_constraint, relationships = self._parse_create_table(statement, _unquote_name(create_match.group(1)))
+                schema.entities[entity.name] = entity
+                if key_constraint: schema.key_constraints.append(key_constraint)
+                schema.relationships.extend(relationships)
+                continue
+            alter_match = _ALTER_TABLE_PATTERN.match(statement)
+            if alter_match: self._apply_alter_table(statement, _unquote_name(alter_match.group(1)), schema)
         return schema
-    def _parse_entity_and_pk(self, block: str):
-        table_name_match = re.search(r"CREATE TABLE\s+([`\"\w]+)", block, re.IGNORECASE)
-        if not table_name_match: return None, None
-        entity_name = table_name_match.group(1).strip('`"')
+    def _parse_create_table(self, block: str, entity_name: str) -> Tuple[Entity, Optional[KeyConstraint], List[Relationship]]:
         entity = Entity(name=entity_name, entity_type="RELATIONAL")
-        content_match = re.search(r"\((.*)\)", block, re.DOTALL)
-        if not content_match: return entity, None
+        content_match = _TABLE_BODY_PATTERN.search(block)
+        if not content_match: return entity, None, []
         content = content_match.group(1)
         definitions = self._split_definitions(content)
         pk_columns = set()
         key_constraint_obj = None
         for def_line in definitions:
-            pk_match = re.search(r"PRIMARY KEY\s*\((.*?)\)", def_line, re.IGNORECASE)
+            pk_match = _PRIMARY_KEY_PATTERN.search(def_line)
             if pk_match:
                 pk_cols_str = pk_match.group(1)
-                pk_columns.update([col.strip().strip('`"') for col in pk_cols_str.split(',')])
-                constraint_name_match = re.search(r"CONSTRAINT\s+([`\"\w]+)", def_line, re.IGNORECASE)
+                # dict.fromkeys preserva a ordem declarada (um set tornaria a saída dependente do hash seed)
+                pk_cols = list(dict.fromkeys(col.strip().strip('`"') for col in pk_cols_str.split(',')))
+                pk_columns.update(pk_cols)
+                constraint_name_match = _CONSTRAINT_NAME_PATTERN.search(def_line)
                 constraint_name = constraint_name_match.group(1).strip('`"') if constraint_name_match else f"{entity_name}Key"
-                key_constraint_obj = KeyConstraint(entity_name=entity_name, properties=list(pk_columns), constraint_name=constraint_name)
+                key_constraint_obj = KeyConstraint(entity_name=entity_name, properties=pk_cols, constraint_name=constraint_name)
                 break
         for def_line in definitions:
             def_line = def_line.strip()
-            if def_line.upper().startswith("CONSTRAINT") or not def_line: continue
+            if not def_line or _TABLE_CONSTRAINT_PATTERN.match(def_line): continue
             parts = def_line.split()
+            if len(parts) < 2: continue
             prop_name = parts[0].strip('`"')
             sql_type = parts[1]
             is_inline_pk = "PRIMARY KEY" in def_line.upper()
@@ -49,27 +193,37 @@ class RelationalParser(SchemaParser):
             prop.constraints.append("REQUIRED" if "NOT NULL" in def_line.upper() else "OPTIONAL")
             if prop_name in pk_columns: prop.constraints.append("KEY")
             entity.properties.append(prop)
-        return entity, key_constraint_obj
-    def _parse_relationships(self, block: str) -> List[Relationship]:
         relationships = []
-        table_name_match = re.search(r"CREATE TABLE\s+([`\"\w]+)", block, re.IGNORECASE)
-        if not table_name_match: return []
-        source_entity_name = table_name_match.group(1).strip('`"')
-        fk_matches = re.finditer(r"CONSTRAINT\s+([`\"\w]+)\s+FOREIGN KEY\s*\((.*?)\)\s+REFERENCES\s+([`\"\w]+)", block, re.IGNORECASE)
-        for match in fk_matches:
-            rel = Relationship(name=match.group(1).strip('`"'), source_entity=source_entity_name, target_entity=match.group(3).strip('`"'), cardinality_fwd="1:1", cardinality_bwd="0:N")
+        for match in _FOREIGN_KEY_PATTERN.finditer(content):
+            rel = Relationship(name=match.group(1).strip('`"'), source_entity=entity_name, target_entity=_unquote_name(match.group(3)), cardinality_fwd="1:1", cardinality_bwd="0:N")
             relationships.append(rel)
-        return relationships
+        return entity, key_constraint_obj, relationships
+    def _apply_alter_table(self, statement: str, entity_name: str, schema: IntermediateSchema):
+        for match in _ADD_CONSTRAINT_PATTERN.finditer(statement):
+            constraint_name, kind, columns_str, target = match.groups()
+            constraint_name = constraint_name.strip('`"')
+            if kind.upper().startswith("FOREIGN"):
+                if target:
+                    schema.relationships.append(Relationship(name=constraint_name, source_entity=entity_name, target_entity=_unquote_name(target), cardinality_fwd="1:1", cardinality_bwd="0:N"))
+                continue
+            entity = schema.entities.get(entity_name)
+            if not entity: continue
+            pk_cols = list(dict.fromkeys(col.strip().strip('`"') for col in columns_str.split(',')))
+            schema.key_constraints.append(KeyConstraint(entity_name=entity_name, properties=pk_cols, constraint_name=constraint_name))
+            for prop in entity.properties:
+                if prop.name in pk_cols and "KEY" not in prop.constraints: prop.constraints.append("KEY")
     def _split_definitions(self, content: str) -> List[str]:
         definitions = []
         balance = 0
         last_split = 0
-        for i, char in enumerate(content):
+        # Salta direto entre parênteses/vírgulas, ignorando os que aparecem dentro de aspas
+        for match in _DEFINITION_SEPARATOR.finditer(content):
+            char = match.group()
             if char == '(': balance += 1
             elif char == ')': balance -= 1
             elif char == ',' and balance == 0:
-                definitions.append(content[last_split:i].strip())
-                last_split = i + 1
+                definitions.append(content[last_split:match.start()].strip())
+                last_split = match.end()
         definitions.append(content[last_split:].strip())
         return [d for d in definitions if d]
     def _map_type(self, sql_type: str) -> str:
@@ -77,4 +231,4 @@ class RelationalParser(SchemaParser):
         if any(t in sql_type_upper for t in ["INT", "REAL", "SMALLINT"]): return "NUMBER"
         if any(t in sql_type_upper for t in ["CHAR", "TEXT"]): return "STRING"
         if any(t in sql_type_upper for t in ["DATE", "TIMESTAMP"]): return "DATE"
-        return "STRING"
\ No newline at end of file
+        return "STRING"
@@ -0,0 +1,178 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import BinaryIO, Dict, Iterator, List, Optional
+from models import Entity, Property, Relationship, KeyConstraint, IntermediateSchema
+
+# Formato binário do IntermediateSchema, para reaproveitar schemas já mapeados sem reler o dialeto de origem.
+#
+#   cabeçalho  <4sHHIII>  magic, versão, flags, nº de strings, bytes da tabela de strings, nº de palavras
+#   strings    nº de strings x uint32 (tamanho em bytes) + blob UTF-8, completado com zeros até múltiplo de 4
+#   corpo      nº de palavras x uint32 little-endian
+#
+# Toda string (nomes, tipos, restrições, chaves de `details`) aparece uma única vez na tabela e o corpo só
+# guarda índices, em pré-ordem: nome do schema, entidades, relações e chaves. Campos opcionais ausentes
+# valem _NONE. Cada valor de `details` leva uma etiqueta: string, lista de strings, lista de Property
+# (ARRAY com nested_properties, recursivo) ou JSON para qualquer outro valor.
+
+MAGIC = b"PSCB"
+FORMAT_VERSION = 1
+BINARY_EXTENSION = ".psb"
+
+_HEADER = struct.Struct("<4sHHIII")
+_NONE = 0xFFFFFFFF
+_DETAIL_STR, _DETAIL_STR_LIST, _DETAIL_PROPERTIES, _DETAIL_JSON = range(4)
+_LITTLE_ENDIAN = sys.byteorder == "little"
+
+class _Encoder:
+    def __init__(self):
+        self.strings: Dict[str, int] = {}
+        self.words = array('I')
+
+    def string(self, value: Optional[str]) -> int:
+        if value is None: return _NONE
+        index = self.strings.get(value)
+        if index is None: index = self.strings[value] = len(self.strings)
+        return index
+
+    def properties(self, properties: List[Property]):
+        words, string = self.words, self.string
+        words.append(len(properties))
+        for prop in properties:
+            words.append(string(prop.name)); words.append(string(prop.type))
+            words.append(len(prop.constraints)); words.extend(string(c) for c in prop.constraints)
+            details = prop._details or {}
+            words.append(len(details))
+            for key, value in details.items():
+                words.append(string(key))
+                if isinstance(value, str):
+                    words.append(_DETAIL_STR); words.append(string(value))
+                elif isinstance(value, list) and value and all(isinstance(v, Property) for v in value):
+                    words.append(_DETAIL_PROPERTIES); self.properties(value)
+                elif isinstance(value, list) and all(isinstance(v, str) for v in value):
+                    words.append(_DETAIL_STR_LIST); words.append(len(value)); words.extend(string(v) for v in value)
+                else:
+                    words.append(_DETAIL_JSON); words.append(string(json.dumps(value)))
+
+    def schema(self, schema: IntermediateSchema):
+        words, string = self.words, self.string
+        words.append(string(schema.name))
+        words.append(len(schema.entities))
+        for entity in schema.entities.values():
+            words.extend((string(entity.name), string(entity.entity_type), string(entity.extends), string(entity.original_type_name)))
+            self.properties(entity.properties)
+        words.append(len(schema.relationships))
+        for rel in schema.relationships:
+            words.extend((string(rel.name), string(rel.source_entity), string(rel.target_entity), string(rel.cardinality_fwd), string(rel.cardinality_bwd)))
+            self.properties(rel.properties)
+        words.append(len(schema.key_constraints))
+        for key in schema.key_constraints:
+            words.extend((string(key.entity_name), string(key.constraint_name), len(key.properties)))
+            words.extend(string(p) for p in key.properties)
+
+def dumps(schema: IntermediateSchema) -> bytes:
+    encoder = _Encoder()
+    encoder.schema(schema)
+    encoded = [s.encode('utf-8', 'surrogatepass') for s in encoder.strings]
+    lengths = array('I', map(len, encoded))
+    blob = b"".join(encoded)
+    words = encoder.words
+    if not _LITTLE_ENDIAN: lengths.byteswap(); words.byteswap()
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(encoded), len(blob), len(words))
+    return b"".join((header, lengths.tobytes(), blob, b"\0" * (-len(blob) % 4), words.tobytes()))
+
+def dump(schema: IntermediateSchema, stream: BinaryIO):
+    stream.write(dumps(schema))
+
+def dump_file(schema: IntermediateSchema, path: str):
+    # Escrita atômica, como no cache: leitores nunca veem um arquivo pela metade
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f: dump(schema, f)
+    os.replace(tmp_path, path)
+
+def _decode_strings(view: memoryview, offset: int, count: int, size: int) -> List[str]:
+    lengths = array('I'); lengths.frombytes(view[offset:offset + 4 * count])
+    if not _LITTLE_ENDIAN: lengths.byteswap()
+    blob = view[offset + 4 * count:offset + 4 * count + size]
+    text = str(blob, 'utf-8', 'surrogatepass')
+    strings, position = [], 0
+    if len(text) == size:
+        # Só ASCII: posições em bytes e em caracteres coincidem, então basta fatiar o texto já decodificado
+        for length in lengths: strings.append(text[position:position + length]); position += length
+    else:
+        for length in lengths: strings.append(str(blob[position:position + length], 'utf-8', 'surrogatepass')); position += length
+    return strings
+
+def _read_properties(next_word, strings: List[str]) -> List[Property]:
+    properties = []
+    new_property = Property.__new__
+    for _ in range(next_word()):
+        # Monta a Property sem passar pelo __init__: a tabela de strings já vem internada
+        prop = new_property(Property)
+        prop.name, prop.type = strings[next_word()], strings[next_word()]
+        count = next_word()
+        prop.constraints = [strings[next_word()] for _ in range(count)] if count else []
+        count = next_word()
+        prop._details = details = {} if count else None
+        for _ in range(count):
+            key, tag = strings[next_word()], next_word()
+            if tag == _DETAIL_STR: details[key] = strings[next_word()]
+            elif tag == _DETAIL_STR_LIST: details[key] = [strings[next_word()] for _ in range(next_word())]
+            elif tag == _DETAIL_PROPERTIES: details[key] = _read_properties(next_word, strings)
+            elif tag == _DETAIL_JSON: details[key] = json.loads(strings[next_word()])
+            else: raise ValueError(f"Etiqueta de detalhe desconhecida no schema binário: {tag}")
+        properties.append(prop)
+    return properties
+
+def _read_schema(words: Iterator[int], strings: List[str]) -> IntermediateSchema:
+    next_word = words.__next__
+    def optional(index: int) -> Optional[str]: return None if index == _NONE else strings[index]
+    schema = IntermediateSchema(name=strings[next_word()])
+    for _ in range(next_word()):
+        name, entity_type, extends, original_type_name = strings[next_word()], strings[next_word()], optional(next_word()), optional(next_word())
+        schema.entities[name] = Entity(name, entity_type, _read_properties(next_word, strings), extends, original_type_name)
+    relationships = []
+    for _ in range(next_word()):
+        fields = [strings[next_word()] for _ in range(5)]
+        relationships.append(Relationship(*fields, _read_properties(next_word, strings)))
+    keys = []
+    for _ in range(next_word()):
+        entity_name, constraint_name = strings[next_word()], optional(next_word())
+        keys.append(KeyConstraint(entity_name, [strings[next_word()] for _ in range(next_word())], constraint_name))
+    # Em bloco, para os índices serem montados uma única vez
+    schema.relationships.extend(relationships); schema.key_constraints.extend(keys)
+    return schema
+
+def _decode(buffer) -> IntermediateSchema:
+    with memoryview(buffer) as view:
+        if len(view) < _HEADER.size or view[:4] != MAGIC:
+            raise ValueError("Conteúdo não é um schema binário do PolySchema.")
+        _, version, _, string_count, string_bytes, word_count = _HEADER.unpack_from(view)
+        if version > FORMAT_VERSION:
+            raise ValueError(f"Versão {version} do schema binário não suportada (máximo {FORMAT_VERSION}).")
+        words_offset = _HEADER.size + 4 * string_count + string_bytes + (-string_bytes % 4)
+        if len(view) != words_offset + 4 * word_count:
+            raise ValueError("Schema binário truncado ou corrompido.")
+        strings = [sys.intern(s) for s in _decode_strings(view, _HEADER.size, string_count, string_bytes)]
+        try:
+            if _LITTLE_ENDIAN:
+                # Lê as palavras direto do buffer (inclusive de um mmap), sem cópia
+                with view[words_offset:] as raw, raw.cast('I') as words: return _read_schema(iter(words), strings)
+            words = array('I'); words.frombytes(view[words_offset:]); words.byteswap()
+            return _read_schema(iter(words), strings)
+        except (StopIteration, IndexError):
+            raise ValueError("Schema binário truncado ou corrompido.") from None
+
+def loads(data: bytes) -> IntermediateSchema:
+    return _decode(data)
+
+def load(stream: BinaryIO) -> IntermediateSchema:
+    return _decode(stream.read())
+
+def load_file(path: str, use_mmap: bool = False) -> IntermediateSchema:
+    with open(path, 'rb') as f:
+        if not use_mmap or os.fstat(f.fileno()).st_size == 0: return load(f)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped: return _decode(mapped)
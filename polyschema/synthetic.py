@@ -0,0 +1,86 @@
+import json
+import random
+from typing import Callable, Dict
+
+# Geradores de schemas sintéticos em cada dialeto suportado, usados pelos benchmarks.
+# Parâmetros comuns: entities, properties (por entidade), depth (aninhamento, quando o dialeto permite),
+# relationship_density (fração de entidades com relação/FK para outra) e seed (reprodutibilidade).
+
+_GPFUSE_TYPES = ["INT", "STR", "FLOAT", "DATE"]
+_JFUSE_TYPES = ["R", "S", "TS", "null"]
+_JSON_TYPES = ["integer", "string", "number", "boolean", "date-time"]
+_SQL_TYPES = ["INT", "VARCHAR(50)", "TEXT", "TIMESTAMP(3)", "SMALLINT", "REAL"]
+
+def gpfuse_schema(entities: int = 100, properties: int = 10, depth: int = 0, relationship_density: float = 0.5, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    blocks = []
+    for i in range(entities):
+        props = ["id INT"]
+        for j in range(1, properties):
+            if j % 7 == 0: props.append(f'OPTIONAL status_{j} ENUM ("A", "B", "C")')
+            elif j % 5 == 0: props.append(f"tags_{j} ARRAY STR (0,{rng.randint(1, 9)})")
+            else: props.append(f"{'OPTIONAL ' if rng.random() < 0.5 else ''}p{j} {rng.choice(_GPFUSE_TYPES)}")
+        blocks.append(f"    (e{i}Type: e{i} {{\n        " + ",\n        ".join(props) + "\n    })")
+    for i in range(entities):
+        if rng.random() < relationship_density:
+            target = rng.randrange(entities)
+            blocks.append(f"    (:e{i}Type)-[r{i}Type: r{i} (1:1); (0:N)]->(:e{target}Type)")
+    for i in range(entities):
+        blocks.append(f"    FOR (x: e{i}Type) EXCLUSIVE MANDATORY SINGLETON x.id")
+    return "CREATE GRAPH TYPE SyntheticGraph STRICT {\n" + ",\n\n".join(blocks) + "\n}"
+
+def jfuse_schema(entities: int = 100, properties: int = 10, depth: int = 1, relationship_density: float = 0.5, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    lines = ["root ::= {" + ", ".join(f"e{i}: arr_e{i}" for i in range(entities)) + "}", ""]
+    for i in range(entities):
+        lines.append(f"arr_e{i} ::= [obj_e{i}_0]")
+        # Cada nível de aninhamento é um arr_* que aponta para o objeto do nível seguinte
+        for level in range(depth + 1):
+            fields = [f"id:R{'k' if level == 0 else ''}"]
+            for j in range(1, properties):
+                if j % 6 == 0: fields.append(f"kind_{j}:[A, B, ...]")
+                else: fields.append(f"p{j}:{rng.choice(_JFUSE_TYPES)}")
+            if level < depth:
+                fields.append(f"children:arr_e{i}_{level + 1}")
+                lines.append(f"arr_e{i}_{level + 1} ::= [obj_e{i}_{level + 1}]")
+            lines.append(f"obj_e{i}_{level} ::= " + ",\n    ".join(fields))
+        lines.append("")
+    return "\n".join(lines)
+
+def redis_schema(entities: int = 100, properties: int = 10, depth: int = 0, relationship_density: float = 0.0, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    # depth > 0 faz parte das propriedades apontar ($ref) para definições compartilhadas
+    definitions = {f"shared_{d}": {"type": rng.choice(_JSON_TYPES)} for d in range(depth)}
+    entity_schemas = {}
+    for i in range(entities):
+        props = {}
+        for j in range(properties):
+            if depth and j % 4 == 3: props[f"p{j}"] = {"$ref": f"#/definitions/shared_{j % depth}"}
+            else: props[f"p{j}"] = {"type": rng.choice(_JSON_TYPES)}
+        entity_schemas[f"e{i}"] = {"type": "object", "properties": props, "required": [f"p{j}" for j in range(properties) if rng.random() < 0.3]}
+    document = {"$schema": "http://json-schema.org", "title": "SyntheticRedis", "type": "object", "properties": entity_schemas}
+    if definitions: document["definitions"] = definitions
+    return json.dumps(document, indent=2)
+
+def relational_schema(entities: int = 100, properties: int = 10, depth: int = 0, relationship_density: float = 0.5, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    statements = []
+    for i in range(entities):
+        columns = [f"    e{i}_id INT NOT NULL"]
+        for j in range(1, properties):
+            columns.append(f"    c{j} {rng.choice(_SQL_TYPES)}{' NOT NULL' if rng.random() < 0.5 else ''}")
+        columns.append(f"    CONSTRAINT pk_e{i} PRIMARY KEY (e{i}_id)")
+        if i and rng.random() < relationship_density:
+            target = rng.randrange(i)
+            columns.append(f"    CONSTRAINT fk_e{i}_e{target} FOREIGN KEY(e{i}_id) REFERENCES e{target}(e{target}_id)")
+        statements.append(f"CREATE TABLE e{i} (\n" + ",\n".join(columns) + "\n);")
+        # Ruído típico de dumps: índices e comentários entre as tabelas
+        statements.append(f"CREATE INDEX idx_e{i} ON e{i} (e{i}_id);\n-- tabela e{i}; fim")
+    return "\n\n".join(statements) + "\n"
+
+GENERATORS: Dict[str, Callable[..., str]] = {
+    "gpfuse": gpfuse_schema,
+    "jfuse": jfuse_schema,
+    "redis": redis_schema,
+    "relational": relational_schema,
+}
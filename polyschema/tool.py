@@ -1,24 +1,143 @@
+import hashlib
+import importlib
+from typing import Callable, Dict, List, Optional, TextIO, Tuple, Union
 from models import IntermediateSchema
 from generator import SchemaGenerator
-from parsers import SchemaParser, GPFuseParser, JFuseParser, RedisParser, RelationalParser
+from instrumentation import Metrics, maybe_stage
+from detection import detect_gpfuse, detect_jfuse, detect_redis, detect_relational
+from parsers import SchemaParser
+
+Detector = Callable[[str], float]
+ParserFactory = Callable[[], SchemaParser]
+
+# Parsers embutidos como "módulo:Classe": o módulo só é importado, e a classe instanciada, no primeiro uso
+_DEFAULT_PARSERS = {
+    "gpfuse": ("parsers.gpfuse_parser:GPFuseParser", detect_gpfuse),
+    "jfuse": ("parsers.jfuse_parser:JFuseParser", detect_jfuse),
+    "redis": ("parsers.redis_parser:RedisParser", detect_redis),
+    "relational": ("parsers.relational_parser:RelationalParser", detect_relational),
+}
+
+# Grupo de entry points de parsers de terceiros (nome do entry point = nome do parser; o objeto carregado
+# é a classe do parser, que pode expor `detect(head) -> float` para a detecção por conteúdo)
+ENTRY_POINT_GROUP = "polyschema.parsers"
+
+def load_object(spec: str):
+    # "pacote.modulo:Classe" (ou "pacote.modulo:Classe.atributo")
+    module_name, _, attribute = spec.partition(':')
+    obj = importlib.import_module(module_name)
+    for part in filter(None, attribute.split('.')): obj = getattr(obj, part)
+    return obj
+
+def _instantiate(obj) -> SchemaParser:
+    return obj if isinstance(obj, SchemaParser) else obj()
 
 class MapperTool:
+    # Bytes lidos do início do arquivo para a detecção de dialeto
+    SNIFF_BYTES = 4096
+    # Abaixo desta confiança dos detectores já carregados, a detecção também consulta os parsers de entry points
+    # (descobri-los custa mais que todo o resto da inicialização)
+    PLUGIN_DETECTION_THRESHOLD = 0.9
+
     def __init__(self):
-        self._parsers = {}
+        self._parsers: Dict[str, SchemaParser] = {}
+        self._factories: Dict[str, ParserFactory] = {}
+        self._detectors: Dict[str, Detector] = {}
+        self._entry_points = None
+        self._plugin_detectors_loaded = False
+        # Decisões de detecção por hash do trecho inspecionado: arquivos iguais (ou com o mesmo início) não são reavaliados
+        self._detection_cache: Dict[str, Tuple[Optional[str], float]] = {}
         self._generator = SchemaGenerator()
         self._register_default_parsers()
 
     def _register_default_parsers(self):
-        self.register_parser("gpfuse", GPFuseParser())
-        self.register_parser("jfuse", JFuseParser())
-        self.register_parser("redis", RedisParser())
-        self.register_parser("relational", RelationalParser())
+        for name, (spec, detector) in _DEFAULT_PARSERS.items(): self.register_parser(name, spec, detector)
+
+    def register_parser(self, name: str, parser: Union[SchemaParser, str, ParserFactory], detector: Optional[Detector] = None):
+        # `parser`: instância pronta, "módulo:Classe" ou qualquer callable que devolva a instância (ex.: a classe)
+        self._parsers.pop(name, None); self._factories.pop(name, None)
+        if isinstance(parser, SchemaParser): self._parsers[name] = parser
+        elif isinstance(parser, str): self._factories[name] = lambda spec=parser: _instantiate(load_object(spec))
+        else: self._factories[name] = parser
+        if detector is not None: self._detectors[name] = detector
+        else: self._detectors.pop(name, None)
+        self._detection_cache.clear()
 
-    def register_parser(self, name: str, parser: SchemaParser):
-        self._parsers[name] = parser
+    def _discover_entry_points(self) -> Dict:
+        # Feita uma única vez e só quando necessária: importlib.metadata sozinho custa dezenas de ms
+        if self._entry_points is None:
+            from importlib.metadata import entry_points
+            self._entry_points = {ep.name: ep for ep in entry_points(group=ENTRY_POINT_GROUP)
+                                  if ep.name not in self._parsers and ep.name not in self._factories}
+            for name, ep in self._entry_points.items(): self._factories[name] = lambda ep=ep: _instantiate(ep.load())
+        return self._entry_points
 
-    def map(self, schema_text: str, parser_name: str) -> IntermediateSchema:
-        if parser_name not in self._parsers:
+    def _load_plugin_detectors(self):
+        if self._plugin_detectors_loaded: return
+        self._plugin_detectors_loaded = True
+        for name, ep in self._discover_entry_points().items():
+            try:
+                detector = getattr(ep.load(), "detect", None)
+            except Exception:
+                # Plugin quebrado não impede a detecção dos demais; o erro aparece se ele for usado
+                continue
+            if callable(detector): self._detectors[name] = detector
+
+    def parser_names(self) -> List[str]:
+        self._discover_entry_points()
+        return sorted(set(self._parsers) | set(self._factories))
+
+    def detect(self, head: str) -> Tuple[Optional[str], float]:
+        # Devolve (parser, confiança) com a maior confiança entre os detectores; (None, 0.0) se nenhum reconhece
+        head = head.lstrip('\ufeff')
+        cache_key = hashlib.sha1(head.encode('utf-8', 'surrogatepass')).hexdigest()
+        if cache_key in self._detection_cache: return self._detection_cache[cache_key]
+        best_name, best_score = self._best_detection(head)
+        if best_score < self.PLUGIN_DETECTION_THRESHOLD and not self._plugin_detectors_loaded:
+            self._load_plugin_detectors()
+            best_name, best_score = self._best_detection(head)
+        self._detection_cache[cache_key] = (best_name, best_score)
+        return best_name, best_score
+
+    def _best_detection(self, head: str) -> Tuple[Optional[str], float]:
+        best_name, best_score = None, 0.0
+        for name, detector in self._detectors.items():
+            score = detector(head)
+            if score > best_score: best_name, best_score = name, score
+        return best_name, best_score
+
+    def detect_file(self, path: str) -> Tuple[Optional[str], float]:
+        with open(path, 'rb') as f: head = f.read(self.SNIFF_BYTES)
+        # O corte em SNIFF_BYTES pode partir um caractere multibyte ao meio
+        return self.detect(head.decode('utf-8', errors='ignore'))
+
+    def get_parser(self, parser_name: str) -> SchemaParser:
+        parser = self._parsers.get(parser_name)
+        if parser is not None: return parser
+        if parser_name not in self._factories: self._discover_entry_points()
+        factory = self._factories.get(parser_name)
+        if factory is None:
             raise ValueError(f"Parser '{parser_name}' não está registrado.")
-        parser = self._parsers[parser_name]
-        return parser.parse(schema_text)
\ No newline at end of file
+        try:
+            parser = factory()
+        except Exception as e:
+            raise ValueError(f"Falha ao carregar o parser '{parser_name}': {e}") from e
+        self._parsers[parser_name] = parser
+        del self._factories[parser_name]
+        return parser
+
+    def map(self, schema_text: str, parser_name: str, metrics: Optional[Metrics] = None, label: str = "") -> IntermediateSchema:
+        parser = self.get_parser(parser_name)
+        with maybe_stage(metrics, "parse", label, parser=parser_name, input_bytes=len(schema_text)) as record:
+            schema = parser.parse(schema_text)
+            if metrics is not None: record.update_counts(schema)
+        return schema
+
+    def map_stream(self, stream: TextIO, parser_name: str, metrics: Optional[Metrics] = None, label: str = "", input_bytes: Optional[int] = None) -> IntermediateSchema:
+        # Parsers com parse_stream (ex.: RelationalParser) leem a entrada em blocos; os demais recebem o texto inteiro
+        parser = self.get_parser(parser_name)
+        parse_stream = getattr(parser, "parse_stream", None)
+        with maybe_stage(metrics, "parse", label, parser=parser_name, input_bytes=input_bytes) as record:
+            schema = parse_stream(stream) if parse_stream else parser.parse(stream.read())
+            if metrics is not None: record.update_counts(schema)
+        return schema
\ No newline at end of file
@@ -0,0 +1,66 @@
+import io
+from typing import List, Optional, TextIO, Union
+from models import IntermediateSchema
+from generator import SchemaGenerator
+from serialization import load_file
+
+class SchemaUnifier:
+    def __init__(self, name: str = "UnifiedPolySchema", generator: Optional[SchemaGenerator] = None):
+        self.name = name
+        self._generator = generator or SchemaGenerator()
+        # Cada item é um IntermediateSchema (caminho rápido) ou o corpo já extraído de um arquivo gerado
+        self._sources: List[Union[IntermediateSchema, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._sources)
+
+    def add_schema(self, schema: IntermediateSchema):
+        self._sources.append(schema)
+
+    def add_generated_text(self, content: str) -> bool:
+        # Fallback para saídas de execuções anteriores: recorta o corpo entre o primeiro '{' e o último '}'
+        start, end = content.find('{'), content.rfind('}')
+        if not content.lstrip().startswith("SCHEMA") or start == -1 or end <= start:
+            return False
+        self._sources.append(content[start + 1:end])
+        return True
+
+    def add_generated_file(self, path: str) -> bool:
+        with open(path, 'r', encoding='utf-8') as f: return self.add_generated_text(f.read())
+
+    def add_binary_file(self, path: str, use_mmap: bool = True):
+        # Schema salvo no formato binário (serialization): entra como IntermediateSchema, sem reparse
+        self._sources.append(load_file(path, use_mmap=use_mmap))
+
+    def generate(self) -> str:
+        buffer = io.StringIO()
+        self.generate_to(buffer)
+        return buffer.getvalue()
+
+    def generate_to(self, stream: TextIO):
+        # Cada schema entra como '\t' + corpo sem espaços nas pontas, separados por linha em branco
+        stream.write(f"SCHEMA {self.name} {{\n")
+        for i, source in enumerate(self._sources):
+            if i: stream.write("\n\n")
+            if isinstance(source, str):
+                stream.write('\t' + source.strip())
+                continue
+            # O corpo gerado sempre começa com '\t' e termina com um único '\n', que é descartado
+            trimmed = _TrailingNewlineTrimmer(stream)
+            self._generator.generate_definitions_to(source, trimmed)
+            if not trimmed.wrote: stream.write('\t')
+        stream.write("\n}")
+
+class _TrailingNewlineTrimmer:
+    # Repassa as escritas para `stream` retendo o último '\n' até saber se ainda vem mais texto
+    def __init__(self, stream: TextIO):
+        self._stream = stream
+        self._pending = False
+        self.wrote = False
+
+    def write(self, text: str):
+        if not text: return
+        self.wrote = True
+        if self._pending: self._stream.write('\n')
+        self._pending = text.endswith('\n')
+        self._stream.write(text[:-1] if self._pending else text)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# O pacote usa imports planos (from models import ...), como ao rodar polyschema/main.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "polyschema"))
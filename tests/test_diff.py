@@ -0,0 +1,137 @@
+import copy
+import os
+import random
+import shutil
+import pytest
+import main as cli
+from models import IntermediateSchema, Entity, Property, Relationship, KeyConstraint
+from diff import SourceIndex, apply_diff, apply_diffs, diff_schemas, dump_fingerprints, fingerprint_path, fingerprint_schema, load_fingerprints, source_unchanged
+from merge import merge_schemas, normalize_name
+from serialization import dump_file
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _schema(entities, relationships=(), keys=()) -> IntermediateSchema:
+    schema = IntermediateSchema(name="S")
+    for name, props in entities.items(): schema.entities[name] = Entity(name, properties=[Property(n, t) for n, t in props])
+    schema.relationships.extend(relationships); schema.key_constraints.extend(keys)
+    return schema
+
+def _shape(schema: IntermediateSchema):
+    return ([(e.name, e.entity_type, [(p.name, p.type, p.constraints, p._details or {}) for p in e.properties]) for e in schema.entities.values()],
+            [(r.name, r.source_entity, r.target_entity, r.cardinality_fwd, r.cardinality_bwd) for r in schema.relationships],
+            [(k.entity_name, k.properties, k.constraint_name) for k in schema.key_constraints])
+
+def test_diff_schemas_reports_changes():
+    old = _schema({"A": [("x", "NUMBER"), ("y", "STRING")], "B": [("z", "DATE")], "C": []},
+                  [Relationship("ab", "A", "B", "1", "N"), Relationship("bc", "B", "C", "1", "1")], [KeyConstraint("A", ["x"], "AKey")])
+    new = _schema({"A": [("x", "STRING"), ("w", "NUMBER")], "B": [("z", "DATE")], "D": []},
+                  [Relationship("ab", "A", "B", "1", "1"), Relationship("ad", "A", "D", "N", "N")], [KeyConstraint("A", ["w"], "AKey")])
+    diff = diff_schemas(old, new)
+    assert [e.name for e in diff.added_entities] == ["D"] and [e.name for e in diff.removed_entities] == ["C"]
+    (change,) = diff.changed_entities
+    assert change.name == "A" and [p.name for p in change.added_properties] == ["w"] and [p.name for p in change.removed_properties] == ["y"]
+    assert [(o.type, n.type) for o, n in change.changed_properties] == [("NUMBER", "STRING")]
+    assert [r.name for r in diff.added_relationships] == ["ad"] and [r.name for r in diff.removed_relationships] == ["bc"]
+    assert [(o.cardinality_bwd, n.cardinality_bwd) for o, n in diff.changed_relationships] == [("N", "1")]
+    assert [k.properties for k in diff.added_keys] == [["w"]] and [k.properties for k in diff.removed_keys] == [["x"]]
+    assert len(diff_schemas(new, copy.deepcopy(new))) == 0
+
+def test_apply_diff_without_sources_replaces_entities():
+    old = _schema({"A": [("x", "NUMBER")], "B": []})
+    new = _schema({"A": [("x", "STRING"), ("y", "DATE")], "C": []})
+    target = copy.deepcopy(old)
+    apply_diff(target, diff_schemas(old, new))
+    assert _shape(target) == _shape(new)
+    with pytest.raises(ValueError):
+        apply_diff(IntermediateSchema(), diff_schemas(old, new), strict=True)
+
+def test_apply_diffs_matches_full_merge():
+    sources = [
+        _schema({"Patient": [("id", "NUMBER"), ("name", "STRING")], "Visit": [("id", "NUMBER")]},
+                [Relationship("has", "Patient", "Visit", "1", "N")], [KeyConstraint("Patient", ["id"], "PKey")]),
+        _schema({"patient": [("id", "NUMBER"), ("dob", "DATE")], "Drug": [("code", "STRING")]},
+                [Relationship("HAS", "patient", "visit", "1", "N")], [KeyConstraint("Drug", ["code"])]),
+        _schema({"Lab": [("v", "NUMBER")], "drug": [("code", "NUMBER")]}),
+    ]
+    updated = [
+        _schema({"Visit": [("id", "STRING")], "Patient": [("id", "NUMBER")]}, [], [KeyConstraint("Patient", ["id"], "PKey")]),
+        sources[1],
+        _schema({"Lab": [("v", "NUMBER"), ("unit", "STRING")], "Ward": []}, [Relationship("in", "Lab", "Ward", "N", "1")]),
+    ]
+    target, _ = merge_schemas(sources)
+    diffs = [diff_schemas(old, new) for old, new in zip(sources, updated)]
+    apply_diffs(target, diffs, sources=SourceIndex(updated))
+    assert _shape(target) == _shape(merge_schemas(updated)[0])
+
+def test_fingerprints_round_trip_and_invalidation(tmp_path):
+    schema = _schema({"A": [("x", "NUMBER")], "B": []})
+    path = str(tmp_path / "a.psb")
+    dump_file(schema, path)
+    dump_fingerprints(fingerprint_schema(schema), path, "key1")
+    assert load_fingerprints(path) == fingerprint_schema(schema)
+    assert source_unchanged(path, "key1") and not source_unchanged(path, "key2") and not source_unchanged(path, None)
+    # .psb regravado sem as impressões: as guardadas deixam de valer
+    dump_file(_schema({"A": []}), path)
+    assert load_fingerprints(path) is None
+    with open(fingerprint_path(path), 'w', encoding='utf-8') as f: f.write('{"version": 1, "binary": "", "entities": {}}')
+    assert load_fingerprints(path) is None and not source_unchanged(path, "key1")
+    os.remove(fingerprint_path(path))
+    assert load_fingerprints(path) is None and not source_unchanged(path, "key1")
+
+def _run(input_dir, output_dir, cache_dir, *flags):
+    assert cli.main(["--input-dir", str(input_dir), "--output-dir", str(output_dir), "--cache-dir", str(cache_dir), "--workers", "1", *flags]) == 0
+    with open(os.path.join(output_dir, "unified_schema.txt"), 'r', encoding='utf-8') as f: return f.read()
+
+def test_incremental_runs_skip_unchanged_sources(tmp_path, monkeypatch):
+    input_dir = tmp_path / "schemas"
+    shutil.copytree(os.path.join(ROOT, "schemas"), input_dir)
+    output_dir, cache_dir = tmp_path / "result", tmp_path / "cache"
+    reference = lambda: _run(input_dir, tmp_path / "full", tmp_path / "full_cache", "--dedupe")
+    assert _run(input_dir, output_dir, cache_dir, "--incremental") == reference()
+
+    loaded = []
+    original_load_file = cli.load_file
+    def recording_load_file(path, *args, **kwargs):
+        loaded.append(os.path.basename(path)); return original_load_file(path, *args, **kwargs)
+    monkeypatch.setattr(cli, "load_file", recording_load_file)
+
+    # Nada mudou: só o unificado anterior é lido
+    assert _run(input_dir, output_dir, cache_dir, "--incremental") == reference()
+    assert loaded == ["unified_schema.psb"]
+
+    # Uma origem alterada: só o .psb anterior dela é lido
+    loaded.clear()
+    with open(input_dir / "relational.txt", 'a', encoding='utf-8') as f: f.write("\nCREATE TABLE extra_table (\n  extra_id INT NOT NULL,\n  PRIMARY KEY (extra_id)\n);\n")
+    assert _run(input_dir, output_dir, cache_dir, "--incremental") == reference()
+    assert sorted(loaded) == ["relational.psb", "unified_schema.psb"]
+
+    # Origem removida e .psb regravado por --binary sem --incremental: ambos voltam a ser comparados
+    _run(input_dir, tmp_path / "ignored", cache_dir, "--binary")
+    shutil.copy(tmp_path / "ignored" / "jfuse.psb", output_dir / "jfuse.psb"); os.remove(fingerprint_path(str(output_dir / "jfuse.psb")))
+    os.remove(input_dir / "redis.txt")
+    loaded.clear()
+    assert _run(input_dir, output_dir, cache_dir, "--incremental") == reference()
+    assert sorted(loaded) == ["jfuse.psb", "redis.psb", "unified_schema.psb"]
+    assert not os.path.exists(output_dir / "redis.psb") and not os.path.exists(fingerprint_path(str(output_dir / "redis.psb")))
+
+def test_apply_diffs_matches_full_merge_on_random_sources():
+    names, props, types = ["Patient", "patient", "PATIENT_", "Visit", "visit", "Drug", "Lab"], ["id", "Id", "name", "dob"], ["NUMBER", "STRING", "DATE", "NULL", "ENUM"]
+    def random_schema(rng):
+        schema = IntermediateSchema(name="S")
+        for name in rng.sample(names, rng.randint(0, 5)):
+            if normalize_name(name) in {normalize_name(n) for n in schema.entities}: continue
+            schema.entities[name] = Entity(name, rng.choice(["RELATIONAL", "DOCUMENT"]), [
+                Property(p, rng.choice(types), rng.choice([[], ["REQUIRED"], ["OPTIONAL"]]), {'values': [rng.choice("AB")]} if rng.random() < .3 else None)
+                for p in rng.sample(props, rng.randint(0, 3))])
+        schema.relationships.extend(Relationship(rng.choice(["has", "HAS", "in"]), rng.choice(names), rng.choice(names), rng.choice("1N"), rng.choice("1N"),
+                                                 [Property("p", rng.choice(types))] if rng.random() < .3 else []) for _ in range(rng.randint(0, 3)))
+        schema.key_constraints.extend(KeyConstraint(rng.choice(names), rng.sample(props, rng.randint(1, 2)), rng.choice([None, "K1", "K2"])) for _ in range(rng.randint(0, 2)))
+        return schema
+    for seed in range(300):
+        rng = random.Random(seed)
+        sources = [random_schema(rng) for _ in range(rng.randint(1, 4))]
+        updated = [random_schema(rng) if rng.random() < .5 else copy.deepcopy(s) for s in sources]
+        target, _ = merge_schemas(sources)
+        apply_diffs(target, [diff_schemas(old, new) for old, new in zip(sources, updated)], sources=SourceIndex(updated))
+        assert _shape(target) == _shape(merge_schemas(updated)[0]), seed
@@ -0,0 +1,54 @@
+import io
+import os
+import pytest
+from models import IntermediateSchema, Entity, Property, Relationship, KeyConstraint
+from generator import SchemaGenerator
+from tool import MapperTool
+from unifier import SchemaUnifier
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLES = ["gpfuse", "jfuse", "redis", "relational"]
+
+def _read(*parts) -> str:
+    with open(os.path.join(ROOT, *parts), 'r', encoding='utf-8') as f: return f.read()
+
+def _streamed(schema: IntermediateSchema) -> str:
+    buffer = io.StringIO()
+    SchemaGenerator().generate_to(schema, buffer)
+    return buffer.getvalue()
+
+def _sample(name: str) -> IntermediateSchema:
+    return MapperTool().map(_read("schemas", f"{name}.txt"), name)
+
+@pytest.mark.parametrize("name", SAMPLES)
+def test_generate_to_matches_generate_and_result(name):
+    schema = _sample(name)
+    assert _streamed(schema) == SchemaGenerator().generate(schema) == _read("result", f"{name}.txt")
+
+def test_unifier_generate_to_matches_result():
+    unifier = SchemaUnifier()
+    for name in SAMPLES: unifier.add_schema(_sample(name))
+    buffer = io.StringIO()
+    unifier.generate_to(buffer)
+    assert buffer.getvalue() == unifier.generate() == _read("result", "unified_schema.txt")
+
+# Saídas de referência do gerador anterior ao streaming
+EDGE_CASES = [
+    (IntermediateSchema(name="Empty"), "SCHEMA Empty {\n}"),
+    (IntermediateSchema(name="Edge", entities={
+        "Doc": Entity("Doc", "DOCUMENT", [
+            Property("tags", "ARRAY"),
+            Property("note", "STRING", []),
+            Property("items", "ARRAY", ["REQUIRED"], {"nested_properties": [Property("sku", "STRING", ["REQUIRED", "KEY"]), Property("qty", "NUMBER")]})]),
+        "Bare": Entity("Bare", "KEY_VALUE")},
+        relationships=[Relationship("has", "Doc", "Bare", "0:N", "1:1")],
+        key_constraints=[KeyConstraint("Doc", ["a", "b"], "DocKey")]),
+     "SCHEMA Edge {\n\tENTITY Doc {\n\t\tDOCUMENT {\n\t\t\ttags: ARRAY [ STRING ]\n\t\t\tnote: STRING\n"
+     "\t\t\titems: ARRAY [\n\t\t\t\tOBJECT {\n\t\t\t\tsku: STRING { REQUIRED, KEY }\n\t\t\t\tqty: NUMBER\n\t\t\t\t}\n\t\t\t] { REQUIRED }\n"
+     "\t\t}\n\t}\n\tENTITY Bare {\n\t\tKEY_VALUE {\n\n\t\t}\n\t}\n"
+     "\tRELATION has FROM Doc TO Bare (0:N) ; (1:1)\n\tCONSTRAINT DocKey ON Doc.(a, b) IS KEY\n}"),
+]
+
+@pytest.mark.parametrize("schema, expected", EDGE_CASES, ids=["empty", "edge"])
+def test_generate_to_edge_cases(schema, expected):
+    assert _streamed(schema) == SchemaGenerator().generate(schema) == expected
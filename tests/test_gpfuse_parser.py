@@ -0,0 +1,61 @@
+import os
+import pytest
+from generator import SchemaGenerator
+from parsers import GPFuseParser, SchemaSyntaxError
+from parsers.gpfuse_parser import _TokenStream
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _generate(text: str) -> str:
+    return SchemaGenerator().generate(GPFuseParser().parse(text))
+
+def test_sample_matches_result():
+    with open(os.path.join(ROOT, "schemas", "gpfuse.txt"), 'r', encoding='utf-8') as f: text = f.read()
+    with open(os.path.join(ROOT, "result", "gpfuse.txt"), 'r', encoding='utf-8') as f: assert _generate(text) == f.read()
+
+# Saídas de referência do parser por expressões regulares (anterior ao lexer) para as mesmas entradas
+PARITY_CASES = {
+    "single_quoted_enum": (
+        "CREATE GRAPH TYPE G {\n (aType: a { id INT, kind ENUM ('x', 'y') }),\n (bType: b { id INT, c ENUM (\"p\", \"q\") }),\n"
+        " FOR (x: aType) EXCLUSIVE MANDATORY SINGLETON x.id\n}",
+        "SCHEMA G {\n\tENTITY a {\n\t\tGRAPH {\n\t\t\tid: NUMBER { REQUIRED }\n\t\t\tkind: ENUM [\"\"] { REQUIRED }\n\t\t}\n\t}\n"
+        "\tENTITY b {\n\t\tGRAPH {\n\t\t\tid: NUMBER { REQUIRED }\n\t\t\tc: ENUM [\"p\", \"q\"] { REQUIRED }\n\t\t}\n\t}\n"
+        "\tCONSTRAINT aKey ON a.id IS KEY\n}"),
+    "unknown_type_character": (
+        "CREATE GRAPH TYPE G {\n (aType: a { id INT, score FLOAT?, OPTIONAL w STR }),\n (:aType)-[RType: R (1:1); (0:N)]->(:aType)\n}",
+        "SCHEMA G {\n\tENTITY a {\n\t\tGRAPH {\n\t\t\tid: NUMBER { REQUIRED }\n\t\t\tscore: FLOAT? { REQUIRED }\n\t\t\tw: STRING { OPTIONAL }\n\t\t}\n\t}\n"
+        "\tRELATION R FROM a TO a (0:N) ; (1:1)\n}"),
+    "missing_paren_last_entity": (
+        "CREATE GRAPH TYPE G {\n (aType: a { id INT }),\n (bType: b { id INT }\n}",
+        "SCHEMA G {\n\tENTITY a {\n\t\tGRAPH {\n\t\t\tid: NUMBER { REQUIRED }\n\t\t}\n\t}\n}"),
+    "unclosed_array_size": (
+        "CREATE GRAPH TYPE G {\n (aType: a { id INT, tags ARRAY STR (0,5 }),\n (cType: c { id INT })\n}",
+        "SCHEMA G {\n\tENTITY a {\n\t\tGRAPH {\n\t\t\tid: NUMBER { REQUIRED }\n\t\t\ttags: ARRAY [ STRING ] { REQUIRED }\n\t\t}\n\t}\n"
+        "\tENTITY c {\n\t\tGRAPH {\n\t\t\tid: NUMBER { REQUIRED }\n\t\t}\n\t}\n}"),
+}
+
+@pytest.mark.parametrize("text, expected", PARITY_CASES.values(), ids=PARITY_CASES.keys())
+def test_parity_with_regex_parser(text, expected):
+    assert _generate(text) == expected
+
+def test_malformed_block_is_skipped_with_position(capsys):
+    text = "CREATE GRAPH TYPE G {\n (aType: a { id INT }),\n (bType: b { id INT },\n (cType: c { id INT }),\n FOR (x: cType) EXCLUSIVE MANDATORY SINGLETON x.id\n}"
+    schema = GPFuseParser().parse(text)
+    assert list(schema.entities) == ["a", "c"]
+    assert [(k.entity_name, k.properties) for k in schema.key_constraints] == [("c", ["id"])]
+    assert "linha 3, coluna 22" in capsys.readouterr().out
+
+def test_unclosed_string_is_reported(capsys):
+    schema = GPFuseParser().parse("CREATE GRAPH TYPE G {\n (aType: a { id INT, k ENUM (\"x) }),\n (cType: c { id INT })\n}")
+    assert list(schema.entities) == ["c"]
+    assert "String não terminada" in capsys.readouterr().out
+
+def test_syntax_error_position():
+    stream = _TokenStream("a b\n  c")
+    stream.pos = 2
+    with pytest.raises(SchemaSyntaxError) as error: stream.error("Teste")
+    assert (error.value.line, error.value.column) == (2, 3)
+
+def test_comments_are_ignored():
+    text = "CREATE GRAPH TYPE G { // comentário\n (aType: a { /* x */ id INT })\n}"
+    assert list(GPFuseParser().parse(text).entities["a"].properties[0].constraints) == ["REQUIRED"]
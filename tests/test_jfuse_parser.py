@@ -0,0 +1,51 @@
+import os
+from generator import SchemaGenerator
+from parsers import JFuseParser
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _mutual_grammar(n: int, order=None) -> str:
+    order = range(n) if order is None else order
+    rules = ["root ::= {" + ", ".join(f"e{i}: arr_r{i}" for i in order) + "}"]
+    for i in range(n):
+        rules.append(f"arr_r{i} ::= [obj_r{i}]")
+        rules.append(f"obj_r{i} ::= id:Rk, " + ", ".join(f"c{j}:arr_r{j}" for j in range(n)))
+    return "\n".join(rules)
+
+def _count_properties(properties) -> int:
+    return sum(1 + _count_properties(p.details.get('nested_properties', [])) for p in properties)
+
+def test_sample_matches_result():
+    with open(os.path.join(ROOT, "schemas", "jfuse.txt"), 'r', encoding='utf-8') as f: text = f.read()
+    with open(os.path.join(ROOT, "result", "jfuse.txt"), 'r', encoding='utf-8') as f:
+        assert SchemaGenerator().generate(JFuseParser().parse(text)) == f.read()
+
+def test_mutually_recursive_rules_become_refs():
+    n = 8
+    schema = JFuseParser().parse(_mutual_grammar(n))
+    assert len(schema.entities) == n
+    for entity in schema.entities.values():
+        assert [p.details.get('ref') for p in entity.properties[1:]] == [f"obj_r{j}" for j in range(n)]
+    # Cada regra é expandida uma vez: o tamanho é linear na gramática, não fatorial
+    assert sum(_count_properties(e.properties) for e in schema.entities.values()) == n * (n + 1)
+
+def test_recursive_output_does_not_depend_on_root_order():
+    entities = lambda text: {name: [(p.name, p.type, p.constraints, p.details) for p in e.properties] for name, e in JFuseParser().parse(text).entities.items()}
+    assert entities(_mutual_grammar(3)) == entities(_mutual_grammar(3, order=[2, 0, 1]))
+
+def test_shared_rule_is_expanded_not_referenced():
+    text = "\n".join([
+        "root ::= {a: arr_a}", "arr_a ::= [obj_a]", "arr_b ::= [obj_b]", "arr_c ::= [obj_c]",
+        "obj_a ::= x:arr_b, y:arr_c", "obj_b ::= z:arr_c", "obj_c ::= id:Sk, self:arr_c"])
+    x, y = JFuseParser().parse(text).entities["a"].properties
+    z = x.details['nested_properties'][0]
+    for prop in (y, z):
+        c_id, c_self = prop.details['nested_properties']
+        assert c_id.constraints == ["REQUIRED", "KEY"] and c_self.details == {'ref': 'obj_c'}
+    # Usos distintos da mesma expansão não compartilham objetos
+    assert y.details['nested_properties'][0] is not z.details['nested_properties'][0]
+
+def test_nested_keys_are_not_entity_keys():
+    text = "root ::= {a: arr_a}\narr_a ::= [obj_a]\narr_b ::= [obj_b]\nobj_a ::= id:Rk, b:arr_b\nobj_b ::= bid:Sk"
+    schema = JFuseParser().parse(text)
+    assert [(k.entity_name, k.properties) for k in schema.key_constraints] == [("a", ["id"])]
@@ -0,0 +1,67 @@
+import builtins
+import merge
+from models import IntermediateSchema, Entity, Property, Relationship, KeyConstraint
+from merge import SchemaMerger, entity_signature, merge_schemas, normalize_name, widen_type
+
+def _schema(*entities, relationships=(), keys=()) -> IntermediateSchema:
+    schema = IntermediateSchema(name="S")
+    for entity in entities: schema.entities[entity.name] = entity
+    schema.relationships.extend(relationships); schema.key_constraints.extend(keys)
+    return schema
+
+def _props(entity: Entity):
+    return [(p.name, p.type, p.constraints, p._details or {}) for p in entity.properties]
+
+def test_normalize_name_and_widen_type():
+    assert normalize_name("PoeDetail") == normalize_name("poe_detail") == "poedetail"
+    assert widen_type("NULL", "DATE") == "DATE" and widen_type("NUMBER", "DATE") == "STRING"
+    assert widen_type("ARRAY", "STRING") is None
+
+def test_identical_entities_are_deduplicated_regardless_of_property_order():
+    a = Entity("Patient", properties=[Property("id", "NUMBER", ["REQUIRED"]), Property("name", "STRING")])
+    b = Entity("patient", properties=[Property("name", "STRING"), Property("id", "NUMBER", ["REQUIRED"])])
+    merger = SchemaMerger()
+    merger.add(_schema(a)); merger.add(_schema(b))
+    assert (merger.duplicates, merger.merged) == (1, 0)
+    assert list(merger.schema().entities) == ["Patient"]
+
+def test_same_name_entities_are_merged():
+    a = Entity("poe_detail", "DOCUMENT", [Property("id", "NUMBER", ["REQUIRED"]), Property("v", "NUMBER"), Property("s", "ENUM", details={'values': ["A"]})])
+    b = Entity("PoeDetail", "RELATIONAL", [Property("ID", "NUMBER", ["REQUIRED"]), Property("v", "DATE"), Property("s", "ENUM", details={'values': ["B", "A"]}), Property("extra", "NULL")])
+    schema, issues = merge_schemas([_schema(a), _schema(b)])
+    entity = schema.entities["poe_detail"]
+    assert entity.entity_type == "DOCUMENT"
+    assert _props(entity) == [("id", "NUMBER", ["REQUIRED"], {}), ("v", "STRING", [], {}),
+                              ("s", "ENUM", [], {'values': ["A", "B"]}), ("extra", "NULL", ["OPTIONAL"], {})]
+    assert [(i.kind, i.conflict) for i in issues] == [("entity_type", False), ("type", False)]
+
+def test_array_conflicts_and_nested_merge():
+    a = Entity("E", properties=[Property("items", "ARRAY", details={'nested_properties': [Property("x", "NUMBER", ["REQUIRED"])]}), Property("tree", "ARRAY", details={'ref': "obj_t"})])
+    b = Entity("E", properties=[Property("items", "ARRAY", details={'nested_properties': [Property("y", "STRING")]}), Property("tree", "ARRAY", details={'ref': "obj_u"})])
+    schema, issues = merge_schemas([_schema(a), _schema(b)])
+    items, tree = schema.entities["E"].properties
+    assert [(p.name, p.constraints) for p in items.details['nested_properties']] == [("x", ["OPTIONAL"]), ("y", ["OPTIONAL"])]
+    assert tree.details == {'ref': "obj_t"} and [(i.kind, i.property) for i in issues if i.conflict] == [("array", "tree")]
+
+def test_relationships_and_keys_use_canonical_names():
+    first = _schema(Entity("Order"), Entity("Item"), relationships=[Relationship("has", "Order", "Item", "1", "N")], keys=[KeyConstraint("Order", ["id"], "OrderKey")])
+    second = _schema(Entity("order"), relationships=[Relationship("HAS", "order", "item", "1", "1")], keys=[KeyConstraint("order", ["ID"], "other")])
+    schema, issues = merge_schemas([first, second])
+    assert [(r.name, r.source_entity, r.target_entity, r.cardinality_bwd) for r in schema.relationships] == [("has", "Order", "Item", "N")]
+    assert [(k.entity_name, k.properties, k.constraint_name) for k in schema.key_constraints] == [("Order", ["id"], "OrderKey")]
+    assert [i.kind for i in issues] == ["cardinality"]
+
+def test_signature_distinguishes_detail_value_types():
+    as_list = Entity("E", properties=[Property("p", "ENUM", details={'values': ["x"]})])
+    as_string = Entity("E", properties=[Property("p", "ENUM", details={'values': "['x']"})])
+    assert entity_signature(as_list) != entity_signature(as_string)
+
+def test_hash_collisions_do_not_drop_entities(monkeypatch):
+    # Todo hash() colide: entidades diferentes ainda precisam ser mescladas, não descartadas como duplicatas
+    monkeypatch.setattr(builtins, "hash", lambda value: 0)
+    merger = SchemaMerger()
+    merger.add(_schema(Entity("E", properties=[Property("a", "STRING")])))
+    merger.add(_schema(Entity("E", properties=[Property("b", "STRING")])))
+    assert (merger.duplicates, merger.merged) == (0, 1)
+    assert [p.name for p in merger.schema().entities["E"].properties] == ["a", "b"]
+    assert merge.entity_signature(Entity("E")) == merge.entity_signature(Entity("e"))
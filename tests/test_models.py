@@ -0,0 +1,12 @@
+from models import Property
+
+def test_details_dict_is_used_as_given():
+    details = {}
+    prop = Property(name="p", type="STRING", details=details)
+    details['values'] = ["A"]
+    assert prop.details is details and prop.details == {'values': ["A"]}
+
+def test_details_allocated_lazily():
+    prop = Property(name="p", type="".join(["DA", "TE"]))
+    assert prop._details is None and prop == Property(name="p", type="DATE", details={})
+    assert prop.type is Property(name="q", type="DATE").type
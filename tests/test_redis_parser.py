@@ -0,0 +1,61 @@
+import io
+import json
+import os
+import pytest
+from generator import SchemaGenerator
+from parsers import RedisParser
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _sample() -> str:
+    with open(os.path.join(ROOT, "schemas", "redis.txt"), 'r', encoding='utf-8') as f: return f.read()
+
+def _entities(schema):
+    return {name: [(p.name, p.type, p.constraints) for p in e.properties] for name, e in schema.entities.items()}
+
+REFS_AFTER_PROPERTIES = json.dumps({
+    "title": "Refs",
+    "properties": {
+        "plain": {"properties": {"a": {"type": "integer"}}},
+        "user": {"$ref": "#/definitions/user"},
+        "order": {"properties": {"buyer": {"$ref": "#/$defs/id"}, "total": {"type": ["null", "number"]}}, "required": ["total"]},
+    },
+    "definitions": {"user": {"properties": {"name": {"type": "string"}, "born": {"type": "date-time"}}, "required": ["name"]}},
+    "$defs": {"id": {"type": "integer"}},
+})
+
+def test_sample_matches_result():
+    with open(os.path.join(ROOT, "result", "redis.txt"), 'r', encoding='utf-8') as f:
+        assert SchemaGenerator().generate(RedisParser().parse(_sample())) == f.read()
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64, 1 << 16])
+@pytest.mark.parametrize("text", [_sample(), REFS_AFTER_PROPERTIES], ids=["sample", "refs_after_properties"])
+def test_stream_matches_parse(text, chunk_size):
+    parser = RedisParser()
+    assert _entities(parser.parse_stream(io.StringIO(text), chunk_size=chunk_size)) == _entities(parser.parse(text))
+
+def test_refs_declared_after_properties_are_resolved_in_order():
+    schema = RedisParser().parse(REFS_AFTER_PROPERTIES)
+    assert schema.name == "Refs"
+    assert _entities(schema) == {
+        "plain": [("a", "NUMBER", ["OPTIONAL"])],
+        "user": [("name", "STRING", ["REQUIRED"]), ("born", "DATE", ["OPTIONAL"])],
+        "order": [("buyer", "NUMBER", ["OPTIONAL"]), ("total", "NUMBER", ["REQUIRED"])],
+    }
+
+def test_unresolvable_refs_do_not_wait_for_end_of_document():
+    entities = {f"e{i}": {"properties": {"x": {"$ref": "other.json#/x"}, "y": {"$ref": "#/properties/missing"}}} for i in range(50)}
+    text = json.dumps({"properties": entities})
+    stream = io.StringIO(text)
+    first = next(RedisParser().iter_entities(stream, chunk_size=16))
+    assert [(p.name, p.type) for p in first.properties] == [("x", "STRING"), ("y", "STRING")]
+    assert stream.tell() < len(text) // 2
+
+def test_cyclic_refs_terminate():
+    text = json.dumps({"definitions": {"a": {"$ref": "#/definitions/b"}, "b": {"$ref": "#/definitions/a"}},
+                       "properties": {"e": {"$ref": "#/definitions/a"}, "f": {"properties": {"p": {"$ref": "#/definitions/b"}}}}})
+    assert _entities(RedisParser().parse(text)) == {"e": [], "f": [("p", "STRING", ["OPTIONAL"])]}
+
+def test_invalid_json_raises():
+    with pytest.raises(ValueError):
+        RedisParser().parse('{"properties": {"e": {"type": "object"} "f": {}}}')
@@ -0,0 +1,55 @@
+import io
+import os
+import pytest
+from generator import SchemaGenerator
+from parsers import RelationalParser
+from parsers.relational_parser import _iter_statements
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHUNK_SIZES = [1, 2, 3, 7, 16, 64, 1 << 16]
+
+def _sample() -> str:
+    with open(os.path.join(ROOT, "schemas", "relational.txt"), 'r', encoding='utf-8') as f: return f.read()
+
+def _table(name: str) -> str:
+    return f"CREATE TABLE {name} (\n  {name}_id INT NOT NULL,\n  v VARCHAR(10),\n  PRIMARY KEY ({name}_id)\n);\n"
+
+CASES = {
+    "sample": _sample(),
+    "mysql_escaped_quote": "CREATE TABLE a (\n  a_id INT NOT NULL COMMENT 'it\\'s, (x',\n  PRIMARY KEY (a_id)\n) ENGINE=InnoDB COMMENT='x\\\\';\n" + _table("b") + _table("c"),
+    "postgres_e_string": "COMMENT ON TABLE a IS E'it\\'s (odd';\n" + _table("b") + _table("c"),
+    "unbalanced_quote": "CREATE TABLE a (\n  a_id INT COMMENT 'oops,\n  PRIMARY KEY (a_id)\n);\n" + _table("b") + _table("c"),
+    "unbalanced_paren": "CREATE TABLE a (\n  a_id INT CHECK ((a_id > 0),\n  PRIMARY KEY (a_id)\n);\n" + _table("b") + _table("c"),
+    "unclosed_block_comment": "/* oops\n;\n" + _table("b") + _table("c"),
+    "dollar_quoted_body": "CREATE FUNCTION f() RETURNS int AS $$\nBEGIN\n  RETURN 1;\nEND;\n$$ LANGUAGE plpgsql;\n" + _table("b") + _table("c"),
+    "crlf": (_table("b") + _table("c")).replace("\n", "\r\n"),
+}
+
+def test_sample_matches_result():
+    with open(os.path.join(ROOT, "result", "relational.txt"), 'r', encoding='utf-8') as f:
+        assert SchemaGenerator().generate(RelationalParser().parse(_sample())) == f.read()
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("text", CASES.values(), ids=CASES.keys())
+def test_stream_matches_parse(text, chunk_size):
+    parser = RelationalParser()
+    assert parser.parse_stream(io.StringIO(text), chunk_size=chunk_size) == parser.parse(text)
+
+@pytest.mark.parametrize("name, tables", [
+    ("mysql_escaped_quote", ["a", "b", "c"]), ("postgres_e_string", ["b", "c"]), ("unbalanced_quote", ["a", "b", "c"]),
+    ("unbalanced_paren", ["a", "b", "c"]), ("unclosed_block_comment", ["b", "c"]), ("dollar_quoted_body", ["b", "c"])])
+def test_later_tables_survive(name, tables):
+    schema = RelationalParser().parse(CASES[name])
+    assert list(schema.entities) == tables
+    assert [key.entity_name for key in schema.key_constraints] == tables
+
+def test_escaped_quote_does_not_split_columns():
+    columns = [p.name for p in RelationalParser().parse(CASES["mysql_escaped_quote"]).entities["a"].properties]
+    assert columns == ["a_id"]
+
+def test_unterminated_quote_does_not_buffer_until_eof():
+    # Sem a fronteira de dump, tudo depois da aspa aberta viraria um único statement
+    text = "CREATE TABLE a (a_id INT COMMENT 'oops);\n" + "".join(_table(f"t{i}") for i in range(200))
+    statements = list(_iter_statements(io.StringIO(text), 64))
+    assert len(statements) == 201
+    assert max(map(len, statements)) < 200
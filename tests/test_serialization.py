@@ -0,0 +1,68 @@
+import io
+import os
+import struct
+import pytest
+from models import IntermediateSchema, Entity, Property, Relationship, KeyConstraint
+from generator import SchemaGenerator
+from serialization import dump, dumps, dump_file, load, loads, load_file
+from tool import MapperTool
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLES = ["gpfuse", "jfuse", "redis", "relational"]
+
+def _sample(name: str) -> IntermediateSchema:
+    with open(os.path.join(ROOT, "schemas", f"{name}.txt"), 'r', encoding='utf-8') as f:
+        return MapperTool().map(f.read(), name)
+
+def _edge_schema() -> IntermediateSchema:
+    nested = [Property("inner", "NUMBER", ["KEY"]), Property("again", "ARRAY", details={'ref': "obj_self"})]
+    schema = IntermediateSchema(name="Ãrvore ✓ \U0001F600")
+    schema.entities["A"] = Entity("A", "DOCUMENT", [
+        Property("plain", "STRING"),
+        Property("status", "ENUM", ["REQUIRED", "OPTIONAL"], {'values': ["x", "ÿ", ""]}),
+        Property("items", "ARRAY", details={'nested_properties': nested, 'size': 3}),
+        Property("empty", "ARRAY", details={'nested_properties': [], 'values': []}),
+        Property("mixed", "STRING", details={'default': {"k": [1, None, True]}, 'bad': "\ud800"}),
+    ], extends=None, original_type_name="a_t")
+    schema.entities["B"] = Entity("B", extends="A")
+    schema.relationships.append(Relationship("A_B", "A", "B", "1", "N", [Property("since", "DATE")]))
+    schema.key_constraints.extend([KeyConstraint("A", ["plain", "status"], "AKey"), KeyConstraint("B", [])])
+    return schema
+
+@pytest.mark.parametrize("name", SAMPLES)
+def test_sample_round_trip(name, tmp_path):
+    schema = _sample(name)
+    path = str(tmp_path / f"{name}.psb")
+    dump_file(schema, path)
+    for loaded in (loads(dumps(schema)), load_file(path), load_file(path, use_mmap=True)):
+        assert loaded == schema
+        assert SchemaGenerator().generate(loaded) == SchemaGenerator().generate(schema)
+
+def test_edge_cases_round_trip(tmp_path):
+    schema = _edge_schema()
+    loaded = loads(dumps(schema))
+    assert loaded == schema
+    # Índices secundários reconstruídos e strings internadas na leitura
+    assert loaded.relationships_to("B")[0].name == "A_B" and loaded.key_constraint("AKey").properties == ["plain", "status"]
+    assert loaded.entities["A"].properties[0].type is loaded.entities["A"].properties[4].type
+    buffer = io.BytesIO(); dump(schema, buffer); buffer.seek(0)
+    assert load(buffer) == schema
+
+def test_empty_schema_round_trip():
+    assert loads(dumps(IntermediateSchema())) == IntermediateSchema()
+
+@pytest.mark.parametrize("data", [b"", b"XXXX" + b"\0" * 16, dumps(IntermediateSchema(name="n"))[:-4], dumps(IntermediateSchema(name="n")) + b"\0\0\0\0"])
+def test_invalid_data_raises(data):
+    with pytest.raises(ValueError):
+        loads(data)
+
+def test_future_version_raises():
+    data = bytearray(dumps(IntermediateSchema()))
+    struct.pack_into("<H", data, 4, 99)
+    with pytest.raises(ValueError, match="99"):
+        loads(bytes(data))
+
+def test_empty_file_with_mmap_raises(tmp_path):
+    path = tmp_path / "empty.psb"; path.write_bytes(b"")
+    with pytest.raises(ValueError):
+        load_file(str(path), use_mmap=True)